@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This python script generates a synthetic Android project with a strings.xml
+# and its translations, times the phases of gtranslate.py and validate.py on it
+# with the offline pseudo backend and prints the timings as json so that they
+# can be compared across commits.
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from lxml import etree as ET
+import core.resource_index as resource_index
+import core.resources as resources
+import core.translation_backend as translation_backend
+import gtranslate
+import validate
+
+WORDS = (
+    "account app back button cancel change check choose click close continue "
+    "create data delete done download edit email enter error file find free "
+    "help home image item journal list load login message more name new next "
+    "note open option page password photo please privacy profile rate read "
+    "remove save search select send settings share show sign start sync tap "
+    "text today try update upload user view wait welcome write your"
+).split()
+PLACEHOLDERS = ("%1$s", "%2$d", "%d", "%s", "<b>", "&amp;", "@string/app_name")
+PLURAL_QUANTITIES = ("one", "other")
+PHASES = (
+    "gtranslate startup",
+    "validate startup",
+    "parse",
+    "lookup",
+    "translate",
+    "validate",
+    "write",
+)
+
+
+def make_text(rand, placeholder_density):
+    words = rand.sample(WORDS, rand.randint(2, 12))
+    for i in range(len(words)):
+        if rand.random() < placeholder_density:
+            words.insert(i, rand.choice(PLACEHOLDERS))
+    text = " ".join(words).capitalize()
+    if rand.random() < 0.1:
+        text = f"{text}\\n{make_text(rand, placeholder_density)}"
+    return text
+
+
+def make_corpus(
+    folder, keys, languages, plural_ratio, array_ratio, placeholder_density, seed
+):
+    """Writes res/values/strings.xml with keys resources and a translated copy of
+    it for each of the languages, each copy misses a tenth of the translations
+    so that the translation phase has work to do. Returns the input path."""
+    rand = random.Random(seed)
+    root = ET.Element("resources")
+    root.text = "\n    "
+    for i in range(keys):
+        draw = rand.random()
+        if draw < plural_ratio:
+            node = ET.SubElement(root, "plurals", name=f"plural_{i}")
+            for quantity in PLURAL_QUANTITIES:
+                item = ET.SubElement(node, "item", quantity=quantity)
+                item.text = make_text(rand, placeholder_density)
+        elif draw < plural_ratio + array_ratio:
+            node = ET.SubElement(root, "string-array", name=f"array_{i}")
+            for _ in range(rand.randint(2, 5)):
+                ET.SubElement(node, "item").text = make_text(rand, placeholder_density)
+        else:
+            node = ET.SubElement(root, "string", name=f"string_{i}")
+            node.text = make_text(rand, placeholder_density)
+            if rand.random() < 0.02:
+                node.set("translatable", "false")
+        node.tail = "\n    "
+    if len(root):
+        root[-1].tail = "\n"
+
+    in_file_path = os.path.join(folder, "res", "values", "strings.xml")
+    os.makedirs(os.path.dirname(in_file_path))
+    ET.ElementTree(root).write(in_file_path, encoding="utf-8", xml_declaration=True)
+
+    pseudo = translation_backend.PseudoLocBackend()
+    for language in languages:
+        translated = ET.fromstring(ET.tostring(root))
+        for node in list(translated):
+            if rand.random() < 0.1:
+                translated.remove(node)
+                continue
+            for text_node in [node] if node.tag == "string" else node:
+                text_node.text = pseudo.pseudo_localize(text_node.text)
+        out_file_path = os.path.join(folder, "res", f"values-{language}", "strings.xml")
+        os.makedirs(os.path.dirname(out_file_path))
+        ET.ElementTree(translated).write(
+            out_file_path, encoding="utf-8", xml_declaration=True
+        )
+    return in_file_path
+
+
+def time_startup(script_name):
+    """Seconds a new interpreter takes to load the script and print its help, which
+    every run pays, and every pool process too with the spawn start method, even
+    when there is nothing to do."""
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), script_name),
+            "-h",
+        ],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def run_phases(in_file_path, out_folder_path, languages, threads):
+    """Runs every phase once on a fresh corpus and returns its seconds per phase."""
+    timings = {}
+
+    timings["gtranslate startup"] = time_startup("gtranslate.py")
+    timings["validate startup"] = time_startup("validate.py")
+
+    start = time.perf_counter()
+    resource_file = resources.parse_resource_file(in_file_path)
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for language in languages:
+        resource_index.build_resource_index_from_file(
+            os.path.join(out_folder_path, f"values-{language}", "strings.xml")
+        )
+    timings["lookup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for language in languages:
+        gtranslate.make_other_lang_string_file(
+            "en",
+            (language, language),
+            in_file_path,
+            out_folder_path,
+            False,
+            threads=threads,
+            resource_file=resource_file,
+        )
+    timings["translate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for language in languages:
+        validate.validate_files(
+            "en",
+            language,
+            in_file_path,
+            out_folder_path,
+            resource_file=resource_file,
+        )
+    timings["validate"] = time.perf_counter() - start
+
+    # the write phase alone, the input is written again as the output
+    output_texts = [
+        (
+            [item.text for item in it.items]
+            if resources.is_item_container(it.tag)
+            else it.text
+        )
+        for it in resource_file.entries
+    ]
+    start = time.perf_counter()
+    for language in languages:
+        resources.write_resource_file(
+            os.path.join(out_folder_path, f"values-{language}", "strings.xml.bench"),
+            resource_file,
+            [(resource_file.entries, output_texts, ())],
+        )
+    timings["write"] = time.perf_counter() - start
+    return timings
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="This is a python module to benchmark gtranslate.py and validate.py on generated strings.xml files"
+    )
+    parser.add_argument(
+        "-keys",
+        action="store",
+        default=2000,
+        type=int,
+        help="set the number of resources of the generated strings.xml, default = 2000",
+    )
+    parser.add_argument(
+        "-langs",
+        action="store",
+        default=5,
+        type=int,
+        help="set the number of generated values-xx folders, default = 5",
+    )
+    parser.add_argument(
+        "-plural-ratio",
+        action="store",
+        dest="plural_ratio",
+        default=0.05,
+        type=float,
+        help="set the share of the resources which are plurals, default = 0.05",
+    )
+    parser.add_argument(
+        "-array-ratio",
+        action="store",
+        dest="array_ratio",
+        default=0.05,
+        type=float,
+        help="set the share of the resources which are string-arrays, default = 0.05",
+    )
+    parser.add_argument(
+        "-placeholder-density",
+        action="store",
+        dest="placeholder_density",
+        default=0.05,
+        type=float,
+        help="set the probability of a placeholder before each word, default = 0.05",
+    )
+    parser.add_argument(
+        "-latency",
+        action="store",
+        default=0,
+        type=float,
+        help="set the seconds each call to the pseudo backend takes, default = 0",
+    )
+    parser.add_argument(
+        "-t",
+        action="store",
+        dest="threads",
+        default=gtranslate.DEFAULT_THREADS,
+        type=int,
+        help=f"set the number of translation requests in flight at the same time for each language, default = {gtranslate.DEFAULT_THREADS}",
+    )
+    parser.add_argument(
+        "-repeat",
+        action="store",
+        default=3,
+        type=int,
+        help="set the number of times the phases are run, each time on a new copy of the generated files, default = 3",
+    )
+    parser.add_argument(
+        "-seed",
+        action="store",
+        default=0,
+        type=int,
+        help="set the seed of the generated files, default = 0",
+    )
+    parser.add_argument(
+        "-output",
+        action="store",
+        default="",
+        help="specify the path of the json result file, default = print it",
+    )
+    args = parser.parse_args(argv)
+
+    languages = [f"x{i}" for i in range(args.langs)]
+    translation_backend.set_backend(
+        translation_backend.PseudoLocBackend(args.latency, seed=args.seed)
+    )
+
+    runs = []
+    work_folder = tempfile.mkdtemp(prefix="gtranslate-benchmark-")
+    try:
+        corpus_folder = os.path.join(work_folder, "corpus")
+        make_corpus(
+            corpus_folder,
+            args.keys,
+            languages,
+            args.plural_ratio,
+            args.array_ratio,
+            args.placeholder_density,
+            args.seed,
+        )
+        for i in range(args.repeat):
+            print(f"Run {i + 1} of {args.repeat}", file=sys.stderr)
+            run_folder = os.path.join(work_folder, f"run-{i}")
+            shutil.copytree(corpus_folder, run_folder)
+            runs.append(
+                run_phases(
+                    os.path.join(run_folder, "res", "values", "strings.xml"),
+                    os.path.join(run_folder, "res"),
+                    languages,
+                    args.threads,
+                )
+            )
+            shutil.rmtree(run_folder)
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    result = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "keys": args.keys,
+            "langs": args.langs,
+            "plural_ratio": args.plural_ratio,
+            "array_ratio": args.array_ratio,
+            "placeholder_density": args.placeholder_density,
+            "latency": args.latency,
+            "threads": args.threads,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "phases": {
+            phase: {
+                "min": min(it[phase] for it in runs),
+                "median": statistics.median(it[phase] for it in runs),
+                "runs": [it[phase] for it in runs],
+            }
+            for phase in PHASES
+        },
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(result, output_file, indent=1)
+    else:
+        print(json.dumps(result, indent=1))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,21 +1,22 @@
+import filecmp
 import os
 
 
-def __should_allow_values_folder(values_folder_name, output_absolute_path):
+def __should_allow_values_folder(values_folder_name, output_absolute_path, file_name):
     disallowed_values_folder = ["values-night"]
     return (
         values_folder_name.startswith("values-")
         and values_folder_name not in disallowed_values_folder
         and os.path.exists(
-            os.path.join(output_absolute_path, values_folder_name, "strings.xml")
+            os.path.join(output_absolute_path, values_folder_name, file_name)
         )
     )
 
 
-def get_lang_codes_from_values_folders(output_absolute_path):
+def get_lang_codes_from_values_folders(output_absolute_path, file_name="strings.xml"):
     list_of_folders = os.listdir(output_absolute_path)
     values_folder = filter(
-        lambda it: __should_allow_values_folder(it, output_absolute_path),
+        lambda it: __should_allow_values_folder(it, output_absolute_path, file_name),
         list_of_folders,
     )
     string_identifier_names = map(
@@ -23,3 +24,102 @@ def get_lang_codes_from_values_folders(output_absolute_path):
         values_folder,
     )
     return ",".join(string_identifier_names)
+
+
+STATE_FOLDER_NAME = ".gtranslate"
+
+
+def get_state_file_path(output_absolute_path, values_folder_name, file_name, suffix):
+    """Returns the path of a bookkeeping file kept for values_folder_name/file_name.
+
+    These files live in a hidden folder next to the values folders so that they
+    are never picked up as resources. The folder is created by the writer.
+    """
+    return os.path.join(
+        output_absolute_path,
+        STATE_FOLDER_NAME,
+        values_folder_name,
+        f"{file_name}.{suffix}",
+    )
+
+
+def get_temp_file_path(path):
+    """Returns the path where the new content of the resource file at path is
+    written before replacing it, a stray file there can't break the build."""
+    values_folder_path, file_name = os.path.split(path)
+    return get_state_file_path(
+        os.path.dirname(values_folder_path),
+        os.path.basename(values_folder_path),
+        file_name,
+        "tmp",
+    )
+
+
+def replace_if_changed(temp_path, path):
+    """Moves temp_path over path in a single step, unless path already has the
+    same bytes in which case it, and its modification time, is left untouched.
+    Returns True when path changed."""
+    if os.path.exists(path) and filecmp.cmp(temp_path, path, shallow=False):
+        os.remove(temp_path)
+        return False
+    os.replace(temp_path, path)
+    return True
+
+
+# folders which never hold the resources of a module, they are not walked
+SKIPPED_FOLDER_NAMES = {"build", "node_modules"}
+
+
+def find_string_files(project_absolute_path):
+    """Returns the sorted paths of the string resource files in the default values
+    folder, i.e. res/values/*strings*.xml, of every module of the project.
+
+    The project is walked once, hidden and build folders are skipped and only the
+    values folder of a res folder is entered.
+    """
+    found = []
+    for folder_path, folder_names, file_names in os.walk(project_absolute_path):
+        if os.path.basename(folder_path) == "res":
+            folder_names[:] = ["values"] if "values" in folder_names else []
+            continue
+        folder_names[:] = [
+            it
+            for it in folder_names
+            if not it.startswith(".") and it not in SKIPPED_FOLDER_NAMES
+        ]
+        if os.path.basename(folder_path) == "values" and (
+            os.path.basename(os.path.dirname(folder_path)) == "res"
+        ):
+            found.extend(
+                os.path.join(folder_path, it)
+                for it in file_names
+                if "strings" in it and it.endswith(".xml")
+            )
+    return sorted(found)
+
+
+def find_project_string_files(project_absolute_path, lang="", existing_only=False):
+    """Returns (input file path, output folder path, comma-separated languages) of
+    every string resource file of the project with languages to process.
+
+    The languages are lang or, when it is empty, the ones of the values folders
+    holding a translation of the file. With existing_only the languages of lang
+    without a translation of the file are left out.
+    """
+    found = []
+    for in_file_path in find_string_files(project_absolute_path):
+        out_folder_path = os.path.dirname(os.path.dirname(in_file_path))
+        file_lang = lang
+        if not lang or existing_only:
+            existing_lang = get_lang_codes_from_values_folders(
+                out_folder_path, os.path.basename(in_file_path)
+            )
+            file_lang = existing_lang
+            if lang:
+                existing = set(existing_lang.split(","))
+                file_lang = ",".join(
+                    it.strip() for it in lang.split(",") if it.strip() in existing
+                )
+        if file_lang:
+            found.append((in_file_path, out_folder_path, file_lang))
+    return found
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+
+FINGERPRINT_SUFFIX = "fingerprint.json"
+FINGERPRINT_VERSION = 1
+READ_BLOCK_SIZE = 1 << 16
+
+
+def hash_file(path):
+    """Returns the hash of the bytes of the file, None when it doesn't exist."""
+    digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as hashed_file:
+            for block in iter(lambda: hashed_file.read(READ_BLOCK_SIZE), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def load_fingerprint(path):
+    """Returns the dict with the hashes of the input and of the output file of
+    the last complete run, an empty dict when it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as fingerprint_file:
+            fingerprint = json.load(fingerprint_file)
+    except (OSError, ValueError):
+        return {}
+    if fingerprint.get("version") != FINGERPRINT_VERSION:
+        return {}
+    return fingerprint
+
+
+def save_fingerprint(path, source_hash, output_hash):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as fingerprint_file:
+        json.dump(
+            {
+                "version": FINGERPRINT_VERSION,
+                "source": source_hash,
+                "output": output_hash,
+            },
+            fingerprint_file,
+            indent=1,
+            sort_keys=True,
+        )
+    os.replace(temp_path, path)
+
+
+def discard_fingerprint(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def is_up_to_date(path, source_hash, out_file_path):
+    """True when the input and the output file are the ones of the last complete
+    run, nothing is then left to translate."""
+    fingerprint = load_fingerprint(path)
+    return (
+        bool(fingerprint)
+        and source_hash is not None
+        and fingerprint.get("source") == source_hash
+        and fingerprint.get("output") == hash_file(out_file_path)
+    )
@@ -0,0 +1,60 @@
+import json
+import os
+
+JOURNAL_FOLDER_NAME = "journal"
+JOURNAL_SUFFIX = "journal.jsonl"
+
+
+class Journal:
+    """Append-only file of the segments translated for one language during a run.
+
+    Every batch is written and synced to disk as soon as it is translated, so the
+    translations paid for are not lost when the run is killed before the output
+    files are written. Several workers of the same language can append to it, a
+    batch is written with a single call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.journal_file = open(path, "a", encoding="utf-8")
+
+    def record(self, translations):
+        """Appends the translations given as a dict of segment to translated segment."""
+        if not translations:
+            return
+        self.journal_file.write(
+            "".join(
+                json.dumps({"source": segment, "text": text}, ensure_ascii=False) + "\n"
+                for segment, text in translations.items()
+            )
+        )
+        self.journal_file.flush()
+        os.fsync(self.journal_file.fileno())
+
+    def close(self):
+        self.journal_file.close()
+
+
+def load_journal(path):
+    """Returns the dict of segment to translated segment recorded in the journal,
+    the line cut by a killed run is ignored."""
+    translations = {}
+    try:
+        with open(path, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                translations[entry["source"]] = entry["text"]
+    except OSError:
+        return {}
+    return translations
+
+
+def discard_journal(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
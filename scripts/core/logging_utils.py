@@ -0,0 +1,110 @@
+import contextlib
+import functools
+import logging
+import logging.handlers
+import multiprocessing
+import sys
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+# number of records a worker keeps before sending them to the parent process
+BUFFER_CAPACITY = 1000
+
+
+class BufferingQueueHandler(logging.handlers.QueueHandler):
+    """Keeps the records of a worker and sends them to the parent process as a
+    single record when flushed, i.e. at the end of each language, when the
+    buffer is full or on an error. The lines of a language are then never
+    interleaved with the lines of the other processes."""
+
+    def __init__(self, queue, capacity=BUFFER_CAPACITY):
+        super().__init__(queue)
+        self.capacity = capacity
+        self.buffer = []
+        self.buffer_level = logging.NOTSET
+
+    def emit(self, record):
+        self.acquire()
+        try:
+            self.buffer.append(self.format(record))
+            self.buffer_level = max(self.buffer_level, record.levelno)
+            full = len(self.buffer) >= self.capacity
+        finally:
+            self.release()
+        if full or record.levelno >= logging.ERROR:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            record = logging.makeLogRecord(
+                {
+                    "msg": "\n".join(self.buffer),
+                    "levelno": self.buffer_level,
+                    "levelname": logging.getLevelName(self.buffer_level),
+                }
+            )
+            self.buffer = []
+            self.buffer_level = logging.NOTSET
+            self.enqueue(record)
+        finally:
+            self.release()
+
+
+@contextlib.contextmanager
+def listening(level, stream=None):
+    """Sends the records of this process and of the pool workers set up with
+    init_worker_logging to stream, stdout by default, from a single thread.
+
+    Yields the queue to give to the workers. The queue is served by a manager
+    process so that a record is delivered as soon as it is put, even by a
+    worker which is terminated right after its last task.
+    """
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    with multiprocessing.Manager() as manager:
+        queue = manager.Queue()
+        listener = logging.handlers.QueueListener(queue, stream_handler)
+        root = logging.getLogger()
+        # the records of this process go through the queue too, so that they are
+        # printed in order with the records of the workers
+        root.handlers = [logging.handlers.QueueHandler(queue)]
+        root.setLevel(level)
+        listener.start()
+        try:
+            yield queue
+        finally:
+            listener.stop()
+            root.handlers = [stream_handler]
+
+
+def init_worker_logging(queue, level):
+    root = logging.getLogger()
+    root.handlers = [BufferingQueueHandler(queue)]
+    root.setLevel(level)
+
+
+def flush():
+    """Sends the buffered records of this process, called at the end of a task."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+
+def flush_after(task):
+    """Decorates a pool task so that the records of its language are sent to the
+    parent process once it is done."""
+
+    @functools.wraps(task)
+    def wrapper(*args, **kwargs):
+        try:
+            return task(*args, **kwargs)
+        finally:
+            flush()
+
+    return wrapper
@@ -0,0 +1,265 @@
+import contextlib
+import json
+import threading
+import time
+
+# upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# language of the metrics which are not bound to a language, e.g. parsing the input
+RUN_LANGUAGE = "all"
+
+
+class Registry:
+    """Timers, counters and histograms of one process keyed by (language, name).
+
+    A timer holds [calls, seconds] and a histogram [bucket counts, calls,
+    seconds], the bucket counts are not cumulative. The threads sending the
+    batches of a language update them at the same time, every update holds the
+    lock.
+    """
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def add_time(self, language, phase, seconds):
+        with self.lock:
+            timer = self.timers.setdefault((language, phase), [0, 0.0])
+            timer[0] = timer[0] + 1
+            timer[1] = timer[1] + seconds
+
+    def count(self, language, name, amount):
+        with self.lock:
+            self.counters[(language, name)] = (
+                self.counters.get((language, name), 0) + amount
+            )
+
+    def observe(self, language, name, seconds):
+        bucket = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                (language, name), [[0] * (len(LATENCY_BUCKETS) + 1), 0, 0.0]
+            )
+            histogram[0][bucket] = histogram[0][bucket] + 1
+            histogram[1] = histogram[1] + 1
+            histogram[2] = histogram[2] + seconds
+
+    def merge(self, snapshot):
+        with self.lock:
+            self.__merge(snapshot)
+
+    def __merge(self, snapshot):
+        for key, (calls, seconds) in snapshot["timers"].items():
+            timer = self.timers.setdefault(key, [0, 0.0])
+            timer[0] = timer[0] + calls
+            timer[1] = timer[1] + seconds
+        for key, amount in snapshot["counters"].items():
+            self.counters[key] = self.counters.get(key, 0) + amount
+        for key, (buckets, calls, seconds) in snapshot["histograms"].items():
+            histogram = self.histograms.setdefault(
+                key, [[0] * (len(LATENCY_BUCKETS) + 1), 0, 0.0]
+            )
+            histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+            histogram[1] = histogram[1] + calls
+            histogram[2] = histogram[2] + seconds
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "timers": self.timers,
+                "counters": self.counters,
+                "histograms": self.histograms,
+            }
+
+
+# None while the metrics are disabled, every function is then a no-op
+registry = None
+
+
+def enable():
+    global registry
+    registry = Registry()
+
+
+def is_enabled():
+    return registry is not None
+
+
+def add_time(language, phase, seconds):
+    if registry is not None:
+        registry.add_time(language, phase, seconds)
+
+
+@contextlib.contextmanager
+def __timer(language, phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.add_time(language, phase, time.perf_counter() - start)
+
+
+def timer(language, phase):
+    """Context manager adding the time spent in it to the phase of language."""
+    if registry is None:
+        return contextlib.nullcontext()
+    return __timer(language, phase)
+
+
+def count(language, name, amount=1):
+    if registry is not None:
+        registry.count(language, name, amount)
+
+
+def observe(language, name, seconds):
+    if registry is not None:
+        registry.observe(language, name, seconds)
+
+
+def collect():
+    """Returns the metrics of this process and starts new ones, pool workers
+    return them with the result of each task so that the parent merges them.
+    None when the metrics are disabled."""
+    global registry
+    if registry is None:
+        return None
+    snapshot = registry.snapshot()
+    registry = Registry()
+    return snapshot
+
+
+def merge(snapshot):
+    if registry is not None and snapshot is not None:
+        registry.merge(snapshot)
+
+
+def __percentile(histogram, fraction):
+    """Upper bound of the bucket holding the given fraction of the observations."""
+    buckets, calls, _ = histogram
+    seen = 0
+    for bound, bucket_count in zip(LATENCY_BUCKETS + (float("inf"),), buckets):
+        seen = seen + bucket_count
+        if seen >= fraction * calls:
+            return bound
+    return float("inf")
+
+
+def format_summary():
+    lines = []
+    languages = sorted(
+        {key[0] for key in registry.timers}
+        | {key[0] for key in registry.counters}
+        | {key[0] for key in registry.histograms}
+    )
+    for language in languages:
+        parts = [
+            f"{phase} = {seconds:.3f}s"
+            for (it, phase), (_, seconds) in sorted(registry.timers.items())
+            if it == language
+        ]
+        parts.extend(
+            f"{name} = {amount}"
+            for (it, name), amount in sorted(registry.counters.items())
+            if it == language
+        )
+        parts.extend(
+            f"{name} p50 <= {__percentile(histogram, 0.5)}s, p95 <= {__percentile(histogram, 0.95)}s"
+            for (it, name), histogram in sorted(registry.histograms.items())
+            if it == language
+        )
+        lines.append(f"Metrics of {language}: {', '.join(parts)}")
+    return "\n".join(lines)
+
+
+def to_json():
+    return json.dumps(
+        {
+            "timers": [
+                {
+                    "language": language,
+                    "phase": phase,
+                    "calls": calls,
+                    "seconds": seconds,
+                }
+                for (language, phase), (calls, seconds) in sorted(
+                    registry.timers.items()
+                )
+            ],
+            "counters": [
+                {"language": language, "name": name, "value": amount}
+                for (language, name), amount in sorted(registry.counters.items())
+            ],
+            "histograms": [
+                {
+                    "language": language,
+                    "name": name,
+                    "buckets": dict(
+                        zip(map(str, LATENCY_BUCKETS + ("+Inf",)), buckets)
+                    ),
+                    "calls": calls,
+                    "seconds": seconds,
+                }
+                for (language, name), (buckets, calls, seconds) in sorted(
+                    registry.histograms.items()
+                )
+            ],
+        },
+        indent=1,
+    )
+
+
+def to_prometheus(prefix):
+    """Report in the text format read by the textfile collector of node_exporter."""
+
+    def labels(language, **others):
+        pairs = [("language", language)] + list(others.items())
+        return ",".join(f'{name}="{value}"' for name, value in pairs)
+
+    # the samples of a metric have to follow its TYPE line
+    lines = [f"# TYPE {prefix}_phase_seconds_total counter"]
+    for (language, phase), (_, seconds) in sorted(registry.timers.items()):
+        lines.append(
+            f"{prefix}_phase_seconds_total{{{labels(language, phase=phase)}}} {seconds}"
+        )
+    lines.append(f"# TYPE {prefix}_phase_calls_total counter")
+    for (language, phase), (calls, _) in sorted(registry.timers.items()):
+        lines.append(
+            f"{prefix}_phase_calls_total{{{labels(language, phase=phase)}}} {calls}"
+        )
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for (language, name), amount in sorted(registry.counters.items()):
+        lines.append(f"{prefix}_events_total{{{labels(language, name=name)}}} {amount}")
+    # the histograms are sorted by name, so the languages of a name follow its
+    # single TYPE line
+    previous_name = None
+    for (name, language), (buckets, calls, seconds) in sorted(
+        ((name, language), histogram)
+        for (language, name), histogram in registry.histograms.items()
+    ):
+        metric = f"{prefix}_{name}"
+        if name != previous_name:
+            lines.append(f"# TYPE {metric} histogram")
+            previous_name = name
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative = cumulative + bucket_count
+            lines.append(
+                f"{metric}_bucket{{{labels(language, le=bound)}}} {cumulative}"
+            )
+        lines.append(f"{metric}_sum{{{labels(language)}}} {seconds}")
+        lines.append(f"{metric}_count{{{labels(language)}}} {calls}")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path, report_format, prefix):
+    with open(path, "w") as report_file:
+        if report_format == "prometheus":
+            report_file.write(to_prometheus(prefix))
+        else:
+            report_file.write(to_json())
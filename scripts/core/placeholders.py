@@ -0,0 +1,62 @@
+from collections import namedtuple
+import re
+
+# Parts of a text the translation service must not touch: the tokens already in
+# the text, e.g. the inline elements of a string (see resource_index.MixedText),
+# format specifiers (%1$s, %d, %.2f, %%), references to other strings, html tags
+# and character references. The space flag of a format specifier is left out so
+# that a text like "100% sure" is not matched, and a conversion has to end the
+# word so that "50%off" is not read as %o.
+placeholder_regex = re.compile(
+    r"__PH_\d+__"
+    r"|%%|%(?:\d+\$)?[-#+0,(]*\d*(?:\.\d+)?[sSdfFeExXoOcCbBgGhH]\b"
+    r"|@(?:android:)?string/\w+"
+    r"|</?[a-zA-Z][\w:.-]*(?:\s[^<>]*)?/?>"
+    r"|&(?:[a-zA-Z]\w*|#\d+|#x[0-9a-fA-F]+);"
+)
+
+TOKEN = "__PH_{0}__"
+# services sometimes add spaces inside a token, they are accepted when restoring
+token_regex = re.compile(r"__\s*PH\s*_?\s*(\d+)\s*__")
+
+# text is the text sent for translation and placeholders the replaced parts, the
+# nth token stands for placeholders[n]
+Protected = namedtuple("Protected", ["text", "placeholders"])
+
+
+def protect(text):
+    placeholders = []
+
+    def replace(match):
+        placeholders.append(match.group())
+        return TOKEN.format(len(placeholders) - 1)
+
+    return Protected(placeholder_regex.sub(replace, text), placeholders)
+
+
+def has_text(protected):
+    """False when the text is only made of placeholders, it is then kept as it is."""
+    return bool(token_regex.sub("", protected.text).strip())
+
+
+def restore(protected, translated_text):
+    """Puts the placeholders back into translated_text in a single pass.
+
+    Returns None when the tokens didn't survive the translation, i.e. a token
+    is missing, repeated or unknown.
+    """
+    if not protected.placeholders:
+        return translated_text
+    found = []
+
+    def replace(match):
+        index = int(match.group(1))
+        found.append(index)
+        if index >= len(protected.placeholders):
+            return match.group()
+        return protected.placeholders[index]
+
+    restored = token_regex.sub(replace, translated_text)
+    if sorted(found) != list(range(len(protected.placeholders))):
+        return None
+    return restored
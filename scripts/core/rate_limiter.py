@@ -0,0 +1,142 @@
+import multiprocessing
+import random
+import sys
+import time
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# reasons of the 403 errors with which v2 reports an exceeded rate limit, in
+# lower case
+QUOTA_REASONS = ("ratelimitexceeded", "userratelimitexceeded")
+QUOTA_MESSAGES = QUOTA_REASONS + ("rate limit exceeded",)
+
+
+class TokenBucket:
+    """Token bucket whose state lives in shared memory, so that every pool worker
+    forked after its creation draws from the same budget.
+
+    The rate adapts to the backend: it is halved each time the backend reports
+    that a quota was hit and creeps back up to max_rate on successful calls.
+    """
+
+    def __init__(self, max_rate):
+        self.max_rate = max_rate
+        self.lock = multiprocessing.Lock()
+        self.rate = multiprocessing.Value("d", max_rate, lock=False)
+        self.tokens = multiprocessing.Value("d", max_rate, lock=False)
+        self.updated_at = multiprocessing.Value("d", time.monotonic(), lock=False)
+
+    def __refill(self):
+        now = time.monotonic()
+        self.tokens.value = min(
+            self.rate.value,
+            self.tokens.value + (now - self.updated_at.value) * self.rate.value,
+        )
+        self.updated_at.value = now
+
+    def acquire(self, amount):
+        """Blocks until amount tokens are available. An amount larger than the
+        bucket only waits for a full bucket and leaves the bucket in debt."""
+        while True:
+            with self.lock:
+                self.__refill()
+                needed = min(amount, self.rate.value)
+                if self.tokens.value >= needed:
+                    self.tokens.value = self.tokens.value - amount
+                    return
+                wait = (needed - self.tokens.value) / self.rate.value
+            time.sleep(wait)
+
+    def slow_down(self):
+        with self.lock:
+            self.__refill()
+            self.rate.value = max(self.rate.value / 2, self.max_rate / 100)
+            self.tokens.value = min(self.tokens.value, self.rate.value)
+
+    def speed_up(self):
+        with self.lock:
+            self.rate.value = min(self.rate.value + self.max_rate / 20, self.max_rate)
+
+
+class RateLimiter:
+    """Characters per second and requests per second budgets of the whole run,
+    a budget of 0 is unlimited."""
+
+    def __init__(self, chars_per_second=0, requests_per_second=0):
+        self.chars_bucket = None
+        self.requests_bucket = None
+        if chars_per_second > 0:
+            self.chars_bucket = TokenBucket(chars_per_second)
+        if requests_per_second > 0:
+            self.requests_bucket = TokenBucket(requests_per_second)
+
+    def __buckets(self):
+        return filter(None, (self.chars_bucket, self.requests_bucket))
+
+    def acquire(self, chars):
+        if self.requests_bucket is not None:
+            self.requests_bucket.acquire(1)
+        if self.chars_bucket is not None:
+            self.chars_bucket.acquire(chars)
+
+    def slow_down(self):
+        for bucket in self.__buckets():
+            bucket.slow_down()
+
+    def speed_up(self):
+        for bucket in self.__buckets():
+            bucket.speed_up()
+
+
+def get_status_code(error):
+    """Status code of a google-api-core or requests error, None for other errors."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_quota_error(error):
+    code = get_status_code(error)
+    if code == 429:
+        return True
+    if code != 403:
+        return False
+    # v2 reports exceeded rate limits as 403 with a rateLimitExceeded reason, the
+    # other 403 errors, e.g. permission or billing ones, are not retried
+    reasons = [
+        str(it.get("reason", "")).lower()
+        for it in getattr(error, "errors", None) or ()
+        if isinstance(it, dict)
+    ]
+    if reasons:
+        return any(it in QUOTA_REASONS for it in reasons)
+    message = str(error).lower()
+    return any(it in message for it in QUOTA_MESSAGES)
+
+
+def is_retryable_error(error):
+    if is_quota_error(error):
+        return True
+    if get_status_code(error) in RETRYABLE_STATUS_CODES:
+        return True
+    retryable_types = (ConnectionError, TimeoutError)
+    # requests is only imported by the backends using it, an error can't come
+    # from it when it isn't loaded
+    requests = sys.modules.get("requests")
+    if requests is not None:
+        retryable_types = retryable_types + (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        )
+    return isinstance(error, retryable_types)
+
+
+def get_backoff_delay(
+    attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY
+):
+    """Exponential backoff with full jitter for the given 0 based attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
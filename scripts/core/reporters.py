@@ -0,0 +1,214 @@
+import json
+import os
+import pathlib
+import urllib.parse
+
+import core.resource_index as resource_index
+
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "validate.py"
+# base of the relative paths of a sarif report
+SARIF_ROOT_ID = "SRCROOT"
+
+
+class Reporter:
+    """Writes the findings to output as the languages are validated, nothing is
+    kept once a language is written. rules are the enabled rules and root the
+    folder the reported files belong to, e.g. the project."""
+
+    def __init__(self, output, rules, root="."):
+        self.output = output
+        self.rules = rules
+        self.root = os.path.abspath(root)
+
+    def start(self):
+        pass
+
+    def report(self, lang, path, findings):
+        """Writes the findings of the language lang whose translated file is path."""
+        raise NotImplementedError
+
+    def finish(self, counters):
+        """Closes the report, counters holds the number of findings of each rule."""
+        pass
+
+
+class TextReporter(Reporter):
+    def report(self, lang, path, findings):
+        for finding in findings:
+            lines = [
+                f"{finding.name} ({finding.lang}) {finding.rule}: {finding.message}",
+                f"    english = {finding.original_text!r}",
+                f"    translated = {finding.translated_text!r}",
+            ]
+            if finding.details:
+                lines.append(f"    {finding.details}")
+            self.output.write("\n".join(lines) + "\n\n")
+        self.output.flush()
+
+    def finish(self, counters):
+        self.output.write(
+            f"Findings per rule: {', '.join(f'{it.name} = {counters[it.name]}' for it in self.rules)}\n"
+        )
+
+
+class JsonlReporter(Reporter):
+    """One json object per finding and per line."""
+
+    def report(self, lang, path, findings):
+        for finding in findings:
+            self.output.write(
+                json.dumps(dict(finding._asdict(), path=path), ensure_ascii=False)
+                + "\n"
+            )
+        self.output.flush()
+
+
+class SarifReporter(Reporter):
+    """Static analysis results interchange format, read e.g. by the code scanning
+    of GitHub to annotate pull requests. The results are written one by one
+    inside the single run of the log.
+
+    A result points to the line of its string, the path of the file is relative
+    to root so that it maps to the file of the repository.
+    """
+
+    def start(self):
+        header = json.dumps(
+            {
+                "version": SARIF_VERSION,
+                "$schema": SARIF_SCHEMA,
+                "runs": [
+                    {
+                        "tool": {
+                            "driver": {
+                                "name": TOOL_NAME,
+                                "rules": [
+                                    {
+                                        "id": it.name,
+                                        "shortDescription": {"text": it.description},
+                                    }
+                                    for it in self.rules
+                                ],
+                            }
+                        },
+                        "originalUriBaseIds": {
+                            SARIF_ROOT_ID: {
+                                "uri": pathlib.Path(self.root).as_uri() + "/"
+                            }
+                        },
+                        "results": [],
+                    }
+                ],
+            },
+            indent=1,
+        )
+        # the results are streamed into the empty list of the header
+        split = header.rindex("[]") + 1
+        self.output.write(header[:split])
+        self.footer = header[split:]
+        self.first = True
+
+    def get_artifact_location(self, path):
+        relative_path = os.path.relpath(os.path.abspath(path), self.root)
+        if relative_path.startswith(os.pardir):
+            return {"uri": pathlib.Path(path).absolute().as_uri()}
+        return {
+            "uri": urllib.parse.quote(pathlib.Path(relative_path).as_posix()),
+            "uriBaseId": SARIF_ROOT_ID,
+        }
+
+    def report(self, lang, path, findings):
+        if not findings:
+            return
+        artifact_location = self.get_artifact_location(path)
+        source_lines = resource_index.get_source_lines(path)
+        for finding in findings:
+            physical_location = {"artifactLocation": artifact_location}
+            if finding.name in source_lines:
+                physical_location["region"] = {"startLine": source_lines[finding.name]}
+            result = {
+                "ruleId": finding.rule,
+                "level": "warning",
+                "message": {
+                    "text": f"{finding.message}: {finding.translated_text!r}"
+                    + (f" ({finding.details})" if finding.details else "")
+                },
+                "locations": [
+                    {
+                        "physicalLocation": physical_location,
+                        "logicalLocations": [
+                            {"name": finding.name, "kind": "resource"}
+                        ],
+                    }
+                ],
+                "properties": {
+                    "lang": finding.lang,
+                    "englishText": finding.original_text,
+                    "translatedText": finding.translated_text,
+                },
+            }
+            self.output.write(
+                ("\n" if self.first else ",\n") + json.dumps(result, ensure_ascii=False)
+            )
+            self.first = False
+        self.output.flush()
+
+    def finish(self, counters):
+        self.output.write(("" if self.first else "\n") + self.footer + "\n")
+
+
+class JunitReporter(Reporter):
+    """JUnit XML with a test suite per language and a test case per rule, which
+    fails with the findings of the rule.
+
+    saxutils imports urllib.request, which takes longer than validating most
+    projects, so it is only imported by this reporter."""
+
+    def start(self):
+        from xml.sax.saxutils import quoteattr
+
+        self.output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.output.write(f"<testsuites name={quoteattr(TOOL_NAME)}>\n")
+
+    def report(self, lang, path, findings):
+        from xml.sax.saxutils import escape, quoteattr
+
+        findings_per_rule = {it.name: [] for it in self.rules}
+        for finding in findings:
+            findings_per_rule[finding.rule].append(finding)
+        failures = sum(1 for it in findings_per_rule.values() if it)
+        self.output.write(
+            f"  <testsuite name={quoteattr(f'values-{lang}')} tests=\"{len(self.rules)}\" failures=\"{failures}\" file={quoteattr(path)}>\n"
+        )
+        for rule_name, rule_findings in findings_per_rule.items():
+            attributes = (
+                f"name={quoteattr(rule_name)} classname={quoteattr(f'values-{lang}')}"
+            )
+            if not rule_findings:
+                self.output.write(f"    <testcase {attributes}/>\n")
+                continue
+            body = "\n".join(
+                f"{it.name}: {it.message}, english = {it.original_text!r}, translated = {it.translated_text!r}"
+                + (f", {it.details}" if it.details else "")
+                for it in rule_findings
+            )
+            self.output.write(
+                f"    <testcase {attributes}>\n"
+                f"      <failure message={quoteattr(f'{len(rule_findings)} findings')}>{escape(body)}</failure>\n"
+                f"    </testcase>\n"
+            )
+        self.output.write("  </testsuite>\n")
+        self.output.flush()
+
+    def finish(self, counters):
+        self.output.write("</testsuites>\n")
+
+
+REPORTERS = {
+    "text": TextReporter,
+    "jsonl": JsonlReporter,
+    "sarif": SarifReporter,
+    "junit": JunitReporter,
+}
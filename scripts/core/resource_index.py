@@ -0,0 +1,165 @@
+from xml.sax.saxutils import escape
+
+from lxml import etree as ET
+import core.placeholders as placeholders
+
+RESOURCE_TAGS = ("string", "string-array", "plurals")
+# xliff:g marks the parts of a text which must not be translated
+XLIFF_G_TAG = "{urn:oasis:names:tc:xliff:document:1.2}g"
+
+
+class MixedText(str):
+    """Text of a string or item with inline elements (e.g. xliff:g, b or a).
+
+    An xliff:g or empty element is replaced by a placeholder token and kept,
+    serialized without its tail, in children. The start and end tags of the
+    other elements, e.g. <b>, are replaced by tokens of their own so that the
+    text inside them is translated with the text around them. The nth token
+    stands for children[n].
+    """
+
+    def __new__(cls, text, children):
+        mixed_text = super().__new__(cls, text)
+        mixed_text.children = children
+        return mixed_text
+
+    def __reduce__(self):
+        return MixedText, (str(self), self.children)
+
+
+def __is_kept_whole(node):
+    return (
+        not isinstance(node.tag, str)
+        or node.tag == XLIFF_G_TAG
+        or (len(node) == 0 and not node.text)
+    )
+
+
+def __split_tags(node):
+    """Start and end tags of node, with the namespaces in scope declared."""
+    element = ET.Element(node.tag, node.attrib, nsmap=node.nsmap)
+    element.text = ""
+    serialized = ET.tostring(element, encoding=str)
+    end = serialized.rindex("</")
+    return serialized[:end], serialized[end:]
+
+
+def __add_parts(node, parts, children):
+    for child in node:
+        if __is_kept_whole(child):
+            parts.append(placeholders.TOKEN.format(len(children)))
+            children.append(ET.tostring(child, encoding=str, with_tail=False))
+        else:
+            start_tag, end_tag = __split_tags(child)
+            parts.append(placeholders.TOKEN.format(len(children)))
+            children.append(start_tag)
+            parts.append(child.text or "")
+            __add_parts(child, parts, children)
+            parts.append(placeholders.TOKEN.format(len(children)))
+            children.append(end_tag)
+        parts.append(child.tail or "")
+
+
+def get_text(node):
+    """Text of node, a MixedText when it has child elements."""
+    if len(node) == 0:
+        return node.text
+    parts = [node.text or ""]
+    children = []
+    __add_parts(node, parts, children)
+    return MixedText("".join(parts), tuple(children))
+
+
+def __parse_markup(text, children):
+    parts = placeholders.token_regex.split(text)
+    markup = [escape(parts[0])]
+    for index, text_part in zip(parts[1::2], parts[2::2]):
+        markup.append(children[int(index)])
+        markup.append(escape(text_part))
+    return ET.fromstring(f"<wrapper>{''.join(markup)}</wrapper>")
+
+
+def set_text(node, text, source_text=None):
+    """Sets the text of node and rebuilds its child elements from the tokens of
+    text. The elements are the ones of text when it was read from a file, else
+    the ones of source_text, the text it was translated from."""
+    children = getattr(text, "children", None) or getattr(source_text, "children", ())
+    if not children or text is None:
+        node.text = text
+        return
+    try:
+        wrapper = __parse_markup(text, children)
+    except ET.XMLSyntaxError:
+        # the translation moved an end tag before its start tag, the tokens are
+        # put back in the order of the source so the tags nest again
+        positions = iter(range(len(children)))
+        wrapper = __parse_markup(
+            placeholders.token_regex.sub(
+                lambda _: placeholders.TOKEN.format(next(positions)), text
+            ),
+            children,
+        )
+    node.text = wrapper.text
+    for child in list(wrapper):
+        node.append(child)
+
+
+def get_item_key(tag, item_node, index):
+    """Plural items are identified by their quantity, string-array items by position."""
+    if tag == "plurals" and item_node.get("quantity") is not None:
+        return item_node.get("quantity")
+    return index
+
+
+def __add_to_index(index, node):
+    name = node.get("name")
+    if name is None or (node.tag, name) in index:
+        return
+    if node.tag == "string":
+        index[(node.tag, name)] = get_text(node)
+    else:
+        items = {}
+        for position, item_node in enumerate(node):
+            items.setdefault(
+                get_item_key(node.tag, item_node, position), get_text(item_node)
+            )
+        index[(node.tag, name)] = items
+
+
+def build_resource_index(root):
+    """Indexes the resources of a parsed strings.xml once so that each lookup is O(1).
+
+    The returned dict is keyed by (tag, name), a string maps to its text and a
+    string-array or plurals maps to a dict of item key to item text. The first
+    resource wins when a name is repeated, same as root.findall(...)[0] did.
+    """
+    index = {}
+    if root is None:
+        return index
+    for node in root.iter(*RESOURCE_TAGS):
+        __add_to_index(index, node)
+    return index
+
+
+def get_source_lines(path):
+    """Returns the dict of the name of every resource of the file at path to the
+    line it starts on, the first resource wins when a name is repeated."""
+    lines = {}
+    for _, node in ET.iterparse(path, events=("end",), tag=RESOURCE_TAGS):
+        lines.setdefault(node.get("name"), node.sourceline)
+        node.clear()
+        while node.getprevious() is not None:
+            del node.getparent()[0]
+    return lines
+
+
+def build_resource_index_from_file(path):
+    """Same as build_resource_index but reads the file with iterparse and frees
+    every resource once indexed, so only the index is kept in memory."""
+    index = {}
+    for _, node in ET.iterparse(path, events=("end",), tag=RESOURCE_TAGS):
+        __add_to_index(index, node)
+        node.clear()
+        while node.getprevious() is not None:
+            del node.getparent()[0]
+    return index
@@ -0,0 +1,214 @@
+from collections import namedtuple
+import itertools
+import os
+
+from lxml import etree as ET
+import core.fileutils as fileutils
+import core.resource_index as resource_index
+
+COMMENT_TAG = "#comment"
+
+# Compact and picklable form of a strings.xml. It is built once in the parent
+# process and shared with the pool workers, which build their output from it
+# instead of parsing the input again and deep-copying the lxml tree. before and
+# after hold the serialized comments around the root element.
+ResourceFile = namedtuple(
+    "ResourceFile", ["tag", "nsmap", "attrib", "text", "before", "after", "entries"]
+)
+
+# One top level node of the file. tag is COMMENT_TAG for comments and items is
+# the tuple of ResourceItem of a string-array or plurals. The text of a string
+# or item with inline markup (e.g. xliff:g) is a resource_index.MixedText.
+ResourceEntry = namedtuple(
+    "ResourceEntry", ["tag", "name", "attrib", "text", "tail", "items"]
+)
+
+# key is the quantity of a plural item and the position of a string-array item
+ResourceItem = namedtuple("ResourceItem", ["key", "attrib", "text", "tail"])
+
+
+def is_item_container(tag):
+    return tag == "string-array" or tag == "plurals"
+
+
+def is_translatable(attrib):
+    return attrib.get("translatable") != "false"
+
+
+def _make_item(tag, item_node, position):
+    assert (
+        item_node.tag == "item"
+    ), f"For {position} index of the type = {tag} is not item"
+    return ResourceItem(
+        resource_index.get_item_key(tag, item_node, position),
+        dict(item_node.attrib),
+        resource_index.get_text(item_node),
+        item_node.tail,
+    )
+
+
+def _make_entry(node):
+    if not isinstance(node.tag, str):
+        return ResourceEntry(COMMENT_TAG, None, {}, node.text, node.tail, ())
+    if is_item_container(node.tag):
+        return ResourceEntry(
+            node.tag,
+            node.get("name"),
+            dict(node.attrib),
+            node.text,
+            node.tail,
+            tuple(
+                _make_item(node.tag, item_node, position)
+                for position, item_node in enumerate(node)
+            ),
+        )
+    return ResourceEntry(
+        node.tag,
+        node.get("name"),
+        dict(node.attrib),
+        resource_index.get_text(node),
+        node.tail,
+        (),
+    )
+
+
+def _serialize_siblings(nodes):
+    return "".join(ET.tostring(node, encoding=str) for node in nodes)
+
+
+def parse_resource_file(path):
+    root = ET.parse(path).getroot()
+    return ResourceFile(
+        root.tag,
+        dict(root.nsmap),
+        dict(root.attrib),
+        root.text,
+        _serialize_siblings(reversed(list(root.itersiblings(preceding=True)))),
+        _serialize_siblings(root.itersiblings()),
+        tuple(_make_entry(node) for node in root),
+    )
+
+
+class ResourceStream:
+    """Reads the entries of a strings.xml one at a time with iterparse, only the
+    entry being read is kept in memory.
+
+    It has the same attributes as ResourceFile except entries, it is iterated
+    instead, and after is only known once all the entries were read.
+    """
+
+    def __init__(self, path):
+        self.events = ET.iterparse(path, events=("start", "end", "comment"))
+        for event, node in self.events:
+            if event == "start":
+                self.root = node
+                break
+        self.tag = self.root.tag
+        self.nsmap = dict(self.root.nsmap)
+        self.attrib = dict(self.root.attrib)
+        self.before = _serialize_siblings(
+            reversed(list(self.root.itersiblings(preceding=True)))
+        )
+        self.after = ""
+        # the text of the root is complete once the next event is read
+        self.lookahead = next(self.events)
+        self.text = self.root.text
+
+    def __iter__(self):
+        depth = 1
+        # a node is yielded once the next one starts, only then its tail is known
+        previous = None
+        for event, node in itertools.chain([self.lookahead], self.events):
+            if event == "end":
+                depth = depth - 1
+                if depth == 1:
+                    previous = node
+                elif depth == 0:
+                    break
+                continue
+            if depth == 1 and previous is not None:
+                yield _make_entry(previous)
+                self.root.remove(previous)
+            if event == "start":
+                depth = depth + 1
+                previous = None
+            elif depth == 1:
+                previous = node
+        if previous is not None:
+            yield _make_entry(previous)
+            self.root.remove(previous)
+        for _ in self.events:
+            pass
+        self.after = _serialize_siblings(self.root.itersiblings())
+
+
+def build_node(entry, output_text):
+    """Builds the element of entry, output_text is the text of a string or the list
+    of item texts of a string-array or plurals."""
+    if entry.tag == COMMENT_TAG:
+        node = ET.Comment(entry.text)
+    else:
+        node = ET.Element(entry.tag, entry.attrib)
+        if is_item_container(entry.tag):
+            node.text = entry.text
+            for item, item_text in zip(entry.items, output_text):
+                item_node = ET.SubElement(node, "item", item.attrib)
+                resource_index.set_text(item_node, item_text, item.text)
+                item_node.tail = item.tail
+        else:
+            resource_index.set_text(node, output_text, entry.text)
+    node.tail = entry.tail
+    return node
+
+
+def write_resource_file(path, resource_file, output_chunks):
+    """Writes the output file incrementally, resource_file is a ResourceFile or a
+    ResourceStream and output_chunks yields (entries, output_texts, dropped).
+
+    output_texts is aligned with the entries of the chunk and the entries whose
+    index is in dropped are left out. The bytes are the same as writing the
+    whole tree with ElementTree.write.
+
+    The file is written aside and then moved over path, so path is never half
+    written, and it is left untouched when its bytes don't change. Returns True
+    when path changed.
+    """
+    # every node is serialized as the only child of a root holding the namespace
+    # declarations, so they are not repeated on each node
+    template = ET.Element(
+        resource_file.tag, resource_file.attrib, nsmap=resource_file.nsmap
+    )
+    template.text = ""
+    empty_root = ET.tostring(template, encoding="utf-8")
+    end_tag = f"</{template.tag}>".encode("utf-8")
+    start_tag = empty_root[: -len(end_tag)]
+    # a root without text, e.g. <resources><string ..., would be serialized as
+    # the self-closing <resources/>, its start tag is written on its own
+    template.text = resource_file.text or ""
+
+    temp_path = fileutils.get_temp_file_path(path)
+    os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+    with open(temp_path, "wb") as out_file:
+        out_file.write(b"<?xml version='1.0' encoding='UTF-8'?>\n")
+        out_file.write(resource_file.before.encode("utf-8"))
+        out_file.write(start_tag)
+        out_file.write(
+            ET.tostring(template, encoding="utf-8")[len(start_tag) : -len(end_tag)]
+        )
+        template.text = ""
+        for entries, output_texts, dropped in output_chunks:
+            for i, entry in enumerate(entries):
+                if i in dropped:
+                    continue
+                node = build_node(entry, output_texts[i])
+                template.append(node)
+                out_file.write(
+                    ET.tostring(template, encoding="utf-8")[
+                        len(start_tag) : -len(end_tag)
+                    ]
+                )
+                template.remove(node)
+            out_file.flush()
+        out_file.write(end_tag)
+        out_file.write(resource_file.after.encode("utf-8"))
+    return fileutils.replace_if_changed(temp_path, path)
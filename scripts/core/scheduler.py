@@ -0,0 +1,25 @@
+def _call_indexed(indexed_call):
+    index, task, args = indexed_call
+    return index, task(*args)
+
+
+def iter_by_cost(pool, task, args_list, costs):
+    """Runs task(*args) on the pool for every args of args_list and yields
+    (index in args_list, result) as soon as each call is done.
+
+    Every call is queued on its own, the costliest first, so a worker done with
+    a cheap call takes the next one instead of a worker stuck with a long one
+    being handed more work up front.
+    """
+    order = sorted(range(len(args_list)), key=lambda i: costs[i], reverse=True)
+    yield from pool.imap_unordered(
+        _call_indexed, [(i, task, args_list[i]) for i in order], chunksize=1
+    )
+
+
+def run_by_cost(pool, task, args_list, costs):
+    """Same as iter_by_cost but returns the results in the order of args_list."""
+    results = [None] * len(args_list)
+    for index, result in iter_by_cost(pool, task, args_list, costs):
+        results[index] = result
+    return results
@@ -0,0 +1,37 @@
+from collections import namedtuple
+import re
+
+# Boundaries at which a string is cut before translation: the escaped \n of
+# strings.xml and real line breaks, together with the whitespace around them,
+# and the whitespace at both ends of the string. They are kept as they are and
+# put back between the translated segments.
+separator_regex = re.compile(r"(\s*(?:\\n|\n)\s*|^\s+|\s+\Z)")
+
+# segments has one more element than separators, the text is
+# segments[0] + separators[0] + segments[1] + ... + segments[-1]
+Segmented = namedtuple("Segmented", ["segments", "separators"])
+
+
+def split(text):
+    parts = separator_regex.split(text)
+    return Segmented(parts[0::2], parts[1::2])
+
+
+def get_translatable_segments(segmented):
+    """Segments sent for translation, the empty ones are kept as they are."""
+    return [segment for segment in segmented.segments if segment]
+
+
+def join(segmented, translated_segments):
+    """Rebuilds the text from the translations of its segments, translated_segments
+    maps a segment to its translation. Returns None if a segment is missing."""
+    if not all(
+        segment in translated_segments for segment in segmented.segments if segment
+    ):
+        return None
+    parts = []
+    for i, segment in enumerate(segmented.segments):
+        if i > 0:
+            parts.append(segmented.separators[i - 1])
+        parts.append(translated_segments[segment] if segment else segment)
+    return "".join(parts)
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+
+MANIFEST_SUFFIX = "sources.json"
+MANIFEST_VERSION = 1
+
+
+def hash_text(text):
+    # the inline elements of a MixedText are part of its source, a translation
+    # keeps the ones of the text it was made from
+    return hashlib.sha1(
+        "".join([text, *getattr(text, "children", ())]).encode("utf-8")
+    ).hexdigest()
+
+
+def make_key(tag, name, item_key=None):
+    if item_key is None:
+        return f"{tag}/{name}"
+    return f"{tag}/{name}/{item_key}"
+
+
+def load_manifest(path):
+    """Returns the dict of key to the hash of the source text it was translated
+    from, an empty dict when the manifest is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("sources", {})
+
+
+def save_manifest(path, sources):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(
+            {"version": MANIFEST_VERSION, "sources": sources},
+            manifest_file,
+            indent=1,
+            sort_keys=True,
+        )
+    os.replace(temp_path, path)
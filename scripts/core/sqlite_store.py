@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+# sqlite limits the number of host parameters of a single statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+class SqliteStore:
+    """Table of a sqlite file whose rows carry the time they were last used.
+
+    Subclasses give the table name and its columns, which have to include a
+    last_used_at REAL column. Several pool workers can use the same file at the
+    same time, every process opens its own connection and sqlite takes care of
+    the locking.
+    """
+
+    table = None
+    columns = None
+
+    def __init__(self, path, max_age_days):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ({self.columns})"
+        )
+        self.connection.commit()
+
+    def select_in(self, key_column, value_column, keys, condition="", parameters=()):
+        """Returns a dict of each of the keys found in key_column to its
+        value_column, condition (e.g. "lang = ?" with its parameters) restricts
+        the rows further."""
+        if condition:
+            condition = f"{condition} AND "
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start : start + LOOKUP_CHUNK_SIZE]
+            found.update(
+                self.connection.execute(
+                    f"""SELECT {key_column}, {value_column} FROM {self.table}
+                    WHERE {condition}{key_column} IN ({",".join("?" * len(chunk))})""",
+                    [*parameters, *chunk],
+                )
+            )
+        return found
+
+    def mark_used(self, condition, parameters_list):
+        """Sets the last use of the rows matching condition, once for each of the
+        parameters of parameters_list, to now."""
+        if not parameters_list:
+            return
+        now = time.time()
+        self.connection.executemany(
+            f"UPDATE {self.table} SET last_used_at = ? WHERE {condition}",
+            [(now, *parameters) for parameters in parameters_list],
+        )
+        self.connection.commit()
+
+    def count_lookup(self, keys, found):
+        self.hits = self.hits + len(found)
+        self.misses = self.misses + len(keys) - len(found)
+
+    def delete_unused(self):
+        """Drops the rows not used for max_age_days without committing, returns
+        their number."""
+        cursor = self.connection.execute(
+            f"DELETE FROM {self.table} WHERE last_used_at < ?",
+            [time.time() - self.max_age_days * 24 * 60 * 60],
+        )
+        return cursor.rowcount
+
+    def evict(self):
+        """Drops the rows not used for max_age_days. Returns their number."""
+        evicted = self.delete_unused()
+        self.connection.commit()
+        return evicted
+
+    def close(self):
+        self.connection.close()
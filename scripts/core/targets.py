@@ -0,0 +1,75 @@
+import logging
+import os
+import sys
+
+import core.fileutils as fileutils
+
+logger = logging.getLogger("targets")
+
+
+def get_out_file_path(in_file_path, out_folder_path, folder_suffix):
+    return os.path.join(
+        out_folder_path, f"values-{folder_suffix}", os.path.basename(in_file_path)
+    )
+
+
+def get_file_target(parser, args):
+    """(input file path, output folder path, comma-separated lang codes) of the
+    input file given with -i, the output folder and the lang codes are derived
+    from it when they are not given."""
+    if not os.path.exists(args.i):
+        logger.error(f"Input path({args.i}) doesn't exists so exiting the program\n")
+        parser.print_help(sys.stderr)
+        sys.exit()
+
+    if os.path.isdir(args.i):
+        logger.error(f"Input path({args.i}) is directory so exiting the program\n")
+        parser.print_help(sys.stderr)
+        sys.exit()
+
+    if not args.o.strip():
+        grand_parent_folder = os.path.dirname(os.path.dirname(args.i))
+        args.o = grand_parent_folder
+        logger.debug(f"Directory path of provided input file {grand_parent_folder}")
+        logger.info(f"Output folder path not provided! Using output path = {args.o}")
+
+    if args.lang == "":
+        derived_lang = fileutils.get_lang_codes_from_values_folders(args.o)
+        if len(derived_lang) == 0:
+            logger.error(
+                f"Couldn't find any lang code to process and none is given in the argument"
+            )
+            parser.print_help(sys.stderr)
+            sys.exit()
+        else:
+            args.lang = derived_lang
+            logger.info(f"No lang codes is given so calculated {args.lang} to process")
+
+    return args.i, args.o, args.lang
+
+
+def get_project_targets(parser, args, action, existing_only=False):
+    """(input file path, output folder path, comma-separated lang codes) of every
+    string resource file of the project given with -project, each one is handled
+    in the res folder of its module. action names what is done to them in the
+    logs and existing_only keeps the lang codes with a translation only."""
+    if not os.path.isdir(args.project):
+        logger.error(
+            f"Project path({args.project}) isn't a directory so exiting the program\n"
+        )
+        parser.print_help(sys.stderr)
+        sys.exit()
+
+    targets = fileutils.find_project_string_files(
+        args.project, args.lang, existing_only
+    )
+    if not targets:
+        logger.error(
+            f"Couldn't find any string resource file with lang codes to {action} in {args.project}"
+        )
+        parser.print_help(sys.stderr)
+        sys.exit()
+    logger.info(
+        f"Found {len(targets)} string resource files with {sum(len(it[2].split(',')) for it in targets)} values folders to {action} in {args.project}"
+    )
+    return targets
@@ -0,0 +1,164 @@
+import os
+import random
+import re
+import threading
+import time
+
+import core.placeholders as placeholders
+
+ENV_KEY_NAME = "GOOGLE_APPLICATION_SERVICE_ACCOUNT_CREDENTIALS_FOR_TRANSLATION"
+
+
+class TranslationBackend:
+    """Interface of a translation service.
+
+    translate() receives a batch of texts and returns the translated texts in the
+    same order. Implementations are created once per process and reused, so the
+    constructor is the place for any expensive setup.
+    """
+
+    name = "base"
+
+    def translate(self, texts, to_language, from_language):
+        raise NotImplementedError
+
+
+class GoogleApiBackend(TranslationBackend):
+    """Google Cloud Translation v2 backend, the client and its HTTP session and
+    auth token are created once and reused for every call."""
+
+    name = "google-api"
+
+    def __init__(self, path_for_service_key_for_translation):
+        # install google-cloud-translate. It takes longer to import than most runs
+        # take without it, so it is only imported once a client is needed
+        from google.cloud import translate_v2 as google_translate_sdk
+
+        self.client = google_translate_sdk.Client.from_service_account_json(
+            path_for_service_key_for_translation
+        )
+
+    def translate(self, texts, to_language, from_language):
+        # Text can also be a sequence of strings, in which case this method
+        # will return a sequence of results for each text.
+        results = self.client.translate(texts, target_language=to_language)
+        return [result["translatedText"] for result in results]
+
+
+class BackendError(Exception):
+    """Error of a backend carrying the HTTP like status code of the failure, so it
+    is retried like the errors of the google client."""
+
+    def __init__(self, message, code):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+PSEUDO_LETTERS = str.maketrans(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "àƀçđéƒĝĥîĵķĺɱñöþǫŕšţûṽŵẋýžÀƁÇĐÉƑĜĤÎĴĶĹṀÑÖÞǪŔŠŢÛṼŴẊÝŽ",
+)
+# placeholder tokens and android escapes (\' \u00e9) are kept as they are
+pseudo_skip_regex = re.compile(
+    rf"{placeholders.token_regex.pattern}|\\u[0-9a-fA-F]{{4}}|\\."
+)
+
+
+class PseudoLocBackend(TranslationBackend):
+    """Local stand-in for a translation service which needs no network, e.g. for
+    benchmarks and tests.
+
+    A text is pseudo-localized: its letters get accents, it is padded by about
+    a third and put between brackets, the same text always gives the same
+    result. Every call waits latency seconds, fails with a 503 with the
+    probability error_rate and fails with a 429 when more than
+    requests_per_second calls were made by this process in the last second.
+    The errors are drawn from a generator seeded with seed.
+    """
+
+    name = "pseudo"
+
+    def __init__(self, latency=0.0, error_rate=0.0, requests_per_second=0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_per_second = requests_per_second
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.call_times = []
+
+    def __check_limits(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.requests_per_second > 0:
+                self.call_times = [it for it in self.call_times if now - it < 1]
+                if len(self.call_times) >= self.requests_per_second:
+                    raise BackendError("Too Many Requests", 429)
+                self.call_times.append(now)
+            if self.random.random() < self.error_rate:
+                raise BackendError("Service Unavailable", 503)
+
+    def pseudo_localize(self, text):
+        parts = []
+        start = 0
+        for match in pseudo_skip_regex.finditer(text):
+            parts.append(text[start : match.start()].translate(PSEUDO_LETTERS))
+            parts.append(match.group())
+            start = match.end()
+        parts.append(text[start:].translate(PSEUDO_LETTERS))
+        padding = "~" * (len(text) // 3)
+        return f"[{''.join(parts)}{padding}]"
+
+    def translate(self, texts, to_language, from_language):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self.__check_limits()
+        return [self.pseudo_localize(text) for text in texts]
+
+
+def create_google_api_backend():
+    assert (
+        ENV_KEY_NAME in os.environ
+    ), f"{ENV_KEY_NAME} is not present in os environment variables. You may have to restart to your application if this variable is just added"
+
+    path_for_service_key_for_translation = os.environ[ENV_KEY_NAME]
+    assert (
+        path_for_service_key_for_translation.strip()
+    ), f"Environment path is not set for {ENV_KEY_NAME}"
+    assert os.path.exists(
+        path_for_service_key_for_translation
+    ), f"File doesn't exists for path {path_for_service_key_for_translation} which is set by {ENV_KEY_NAME}"
+    return GoogleApiBackend(path_for_service_key_for_translation)
+
+
+__backend_factory = create_google_api_backend
+__backend = None
+__backend_pid = None
+__backend_lock = threading.Lock()
+
+
+def set_backend_factory(factory):
+    """Replaces the factory used to create the backend of this process, e.g. to
+    inject a local fake in tests. The already created backend is dropped."""
+    global __backend_factory, __backend, __backend_pid
+    __backend_factory = factory
+    __backend = None
+    __backend_pid = None
+
+
+def set_backend(backend):
+    set_backend_factory(lambda: backend)
+
+
+def get_backend():
+    """Returns the backend of the current process, creating it on first use.
+
+    The backend is bound to the process which created it so that a forked pool
+    worker never shares the HTTP connections of its parent, the threads of a
+    process share the same backend.
+    """
+    global __backend, __backend_pid
+    with __backend_lock:
+        if __backend is None or __backend_pid != os.getpid():
+            __backend = __backend_factory()
+            __backend_pid = os.getpid()
+        return __backend
@@ -0,0 +1,78 @@
+import time
+
+import core.sqlite_store as sqlite_store
+
+MEMORY_FILE_NAME = "translation_memory.sqlite"
+DEFAULT_MAX_ENTRIES = 200000
+DEFAULT_MAX_AGE_DAYS = 180
+
+
+class TranslationMemory(sqlite_store.SqliteStore):
+    """On-disk memory of translations keyed by (source text, source lang, target lang)."""
+
+    table = "translations"
+    columns = """source_text TEXT NOT NULL,
+        source_lang TEXT NOT NULL,
+        target_lang TEXT NOT NULL,
+        translated_text TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        PRIMARY KEY (source_text, source_lang, target_lang)"""
+
+    def __init__(
+        self, path, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS
+    ):
+        super().__init__(path, max_age_days)
+        self.max_entries = max_entries
+
+    def lookup(self, texts, source_lang, target_lang, peek=False):
+        """Returns a dict with the remembered translation of each of the texts
+        which is present in the memory and updates the hit/miss counters.
+
+        With peek the counters and the last use of the translations are left
+        untouched, e.g. to estimate a run.
+        """
+        texts = list(dict.fromkeys(texts))
+        found = self.select_in(
+            "source_text",
+            "translated_text",
+            texts,
+            "source_lang = ? AND target_lang = ?",
+            [source_lang, target_lang],
+        )
+        if peek:
+            return found
+        self.mark_used(
+            "source_text = ? AND source_lang = ? AND target_lang = ?",
+            [(text, source_lang, target_lang) for text in found],
+        )
+        self.count_lookup(texts, found)
+        return found
+
+    def store(self, translations, source_lang, target_lang):
+        """Remembers the translations given as a dict of source text to translated text."""
+        now = time.time()
+        self.connection.executemany(
+            """INSERT OR REPLACE INTO translations
+            (source_text, source_lang, target_lang, translated_text, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (text, source_lang, target_lang, translated_text, now, now)
+                for text, translated_text in translations.items()
+            ],
+        )
+        self.connection.commit()
+
+    def evict(self):
+        """Drops the entries not used for max_age_days and then the least recently
+        used ones above max_entries. Returns the number of dropped entries."""
+        evicted = self.delete_unused()
+        cursor = self.connection.execute(
+            """DELETE FROM translations WHERE rowid NOT IN (
+                SELECT rowid FROM translations ORDER BY last_used_at DESC LIMIT ?
+            )""",
+            [self.max_entries],
+        )
+        evicted = evicted + cursor.rowcount
+        self.connection.commit()
+        return evicted
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import time
+
+import core.sqlite_store as sqlite_store
+
+CACHE_FILE_NAME = "validation_cache.sqlite"
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def make_key(ruleset_version, rule_names, original_text, translated_text):
+    """The findings of a text only depend on the texts and on the rules run, the
+    name of the key and the language are put back when they are replayed."""
+    return hashlib.sha1(
+        json.dumps(
+            [ruleset_version, list(rule_names), original_text, translated_text],
+            ensure_ascii=False,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class ValidationCache(sqlite_store.SqliteStore):
+    """On-disk cache of the findings of each (english text, translated text) pair.
+
+    Findings are stored as a list of [rule name, finding without name and lang],
+    so a pair shared by several keys or languages is validated once.
+    """
+
+    table = "findings"
+    columns = """key TEXT PRIMARY KEY NOT NULL,
+        findings TEXT NOT NULL,
+        last_used_at REAL NOT NULL"""
+
+    def __init__(self, path, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        super().__init__(path, max_age_days)
+
+    def lookup(self, keys):
+        """Returns a dict with the findings of each of the keys present in the
+        cache and updates the hit/miss counters."""
+        keys = list(dict.fromkeys(keys))
+        found = {
+            key: json.loads(findings)
+            for key, findings in self.select_in("key", "findings", keys).items()
+        }
+        self.mark_used("key = ?", [(key,) for key in found])
+        self.count_lookup(keys, found)
+        return found
+
+    def store(self, findings_per_key):
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO findings (key, findings, last_used_at) VALUES (?, ?, ?)",
+            [
+                (key, json.dumps(findings, ensure_ascii=False), now)
+                for key, findings in findings_per_key.items()
+            ],
+        )
+        self.connection.commit()
@@ -0,0 +1,165 @@
+from collections import namedtuple
+from functools import lru_cache
+import re
+import time
+
+import core.metrics as metrics
+
+# Has to be bumped whenever a rule or a finding changes, the cached findings of
+# the older rules are then not used anymore
+RULESET_VERSION = 2
+
+# Making non capturing groups inside the named groups so that only the group of
+# the rule which matched is set
+FORMAT_PATTERN = r"%(?:\d+\$)?s|%(?:\d+\$)?d"
+format_regex = re.compile(FORMAT_PATTERN)
+
+# Every character based check is a group of this single regex, so a translated
+# text is scanned once for all of them
+scan_regex = re.compile(
+    rf"(?P<format>{FORMAT_PATTERN})"
+    r"|(?P<ellipsis>\.\.\.)"
+    r"|(?P<range>\d-\d)"
+    r"|(?P<double_dash>--)"
+    r"|(?P<ampersand>&)"
+    r"|(?P<angle_bracket>[<>])"
+)
+
+Rule = namedtuple("Rule", ["name", "description", "check"])
+
+# One problem found in a translated text. rule is the name of the rule which
+# found it and details an optional hint, e.g. the escaped text
+Finding = namedtuple(
+    "Finding",
+    [
+        "name",
+        "lang",
+        "rule",
+        "message",
+        "original_text",
+        "translated_text",
+        "details",
+    ],
+)
+
+# Result of scanning one translated text, formats are the format specifiers in
+# order and groups the names of all the groups of scan_regex which matched
+Scan = namedtuple("Scan", ["formats", "groups"])
+
+RULES = {}
+
+
+def rule(name, description):
+    """Registers the decorated check(translated_text, original_text, scan) which
+    returns (message, details) or None. Rules run in registration order."""
+
+    def register(check):
+        RULES[name] = Rule(name, description, check)
+        return check
+
+    return register
+
+
+@lru_cache(maxsize=65536)
+def get_english_formats(original_text):
+    """English texts are the same for every language, so they are scanned once."""
+    return format_regex.findall(original_text)
+
+
+def scan(translated_text):
+    formats = []
+    groups = set()
+    for found in scan_regex.finditer(translated_text):
+        if found.lastgroup == "format":
+            formats.append(found.group())
+        groups.add(found.lastgroup)
+    return Scan(formats, groups)
+
+
+@rule("empty", "english or translated string is empty")
+def check_empty(translated_text, original_text, scan):
+    if not original_text:
+        return ("English string is empty", None)
+    if not translated_text:
+        # Case when translated string is empty
+        return ("String is empty", None)
+
+
+@rule("format", "same positional arguments as in the english string")
+def check_format(translated_text, original_text, scan):
+    for match in get_english_formats(original_text):
+        if match not in scan.formats:
+            return (
+                "Positional arguments differ from the english string",
+                f"English positional arguments: {' '.join(get_english_formats(original_text))}",
+            )
+
+
+def make_warning_rule(rule_name, group, characters):
+    @rule(rule_name, f"warning characters {characters}")
+    def check_warning(translated_text, original_text, scan):
+        if group in scan.groups:
+            return (f"Warning characters {characters}", None)
+
+    return check_warning
+
+
+make_warning_rule("ampersand", "ampersand", "&")
+make_warning_rule("ellipsis", "ellipsis", "...")
+make_warning_rule("range", "range", "-")
+make_warning_rule("double-dash", "double_dash", "--")
+
+
+@rule("xml-escaping", "characters which have to be escaped in xml")
+def check_xml_escaping(translated_text, original_text, scan):
+    # escape changes a text only when it contains & < or >
+    if "ampersand" in scan.groups or "angle_bracket" in scan.groups:
+        # saxutils imports urllib.request, only paid for when a text is wrong
+        from xml.sax.saxutils import escape
+
+        escaped = escape(translated_text)
+        return ("Wrong xml escaping", f"Escaped string: {escaped}")
+
+
+def get_enabled_rules(disabled_rule_names=()):
+    unknown = set(disabled_rule_names) - set(RULES)
+    if unknown:
+        raise ValueError(
+            f"Unknown rules {', '.join(sorted(unknown))}, available rules are {', '.join(RULES)}"
+        )
+    return [it for it in RULES.values() if it.name not in disabled_rule_names]
+
+
+def run_rules(name, lang, translated_text, original_text, rules):
+    """Runs every rule of rules against one translated text with a single scan of
+    it and returns the list of Finding.
+
+    An empty text is only checked by the empty rule. The time of each rule is
+    recorded when the metrics are enabled."""
+    if not original_text or not translated_text:
+        rules = [it for it in rules if it.name == "empty"]
+        text_scan = None
+    else:
+        text_scan = scan(translated_text)
+    findings = []
+    timed = metrics.is_enabled()
+    for it in rules:
+        if timed:
+            start = time.perf_counter()
+        found = it.check(translated_text, original_text, text_scan)
+        if timed:
+            metrics.add_time(lang, f"rule {it.name}", time.perf_counter() - start)
+        if found is not None:
+            message, details = found
+            findings.append(
+                Finding(
+                    name,
+                    lang,
+                    it.name,
+                    message,
+                    original_text,
+                    translated_text,
+                    details,
+                )
+            )
+    return findings
@@ -174,30 +174,64 @@
 #   SUBROUTINES
 #
 
-from multiprocessing import Pool
+from multiprocessing import Pool, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import namedtuple
+import functools
+import itertools
 import shutil
 import argparse
+import json
 import re
 import sys
-import traceback
+import logging
+import time
 from lxml import etree as ET
 import os
-import requests
-import html
-import urllib.parse
-import copy
-import six
 import core.fileutils as string_fileutils
-
-# install google-cloud-translate
-from google.cloud import translate_v2 as google_translate_sdk
-
-debug = False
-
-
-def log(msg):
-    if debug:
-        print(msg)
+import core.translation_backend as translation_backend
+import core.translation_memory as translation_memory
+import core.resource_index as resource_index
+import core.resources as resources
+import core.source_manifest as source_manifest
+import core.fingerprint as fingerprint
+import core.journal as translation_journal
+import core.rate_limiter as limiter_utils
+import core.segmenter as segmenter
+import core.placeholders as placeholders
+import core.metrics as metrics
+import core.logging_utils as logging_utils
+import core.scheduler as scheduler
+import core.targets as project_targets
+
+logger = logging.getLogger("gtranslate")
+
+# Upper bounds for a single translate call, the v2 API accepts at most 128 texts
+# and recommends keeping a request below 5k characters
+MAX_BATCH_SIZE = 128
+MAX_BATCH_CHARS = 5000
+
+# Number of batches of one language which are in flight at the same time
+DEFAULT_THREADS = 4
+# A text collected in the first phase of make_other_lang_string_file, item_index
+# is None for a string and the position of the item for a string-array or plurals
+PendingTranslation = namedtuple(
+    "PendingTranslation",
+    ["index", "item_index", "name", "text", "manifest_key", "previous_translation"],
+)
+
+# Number of entries read, translated and written at a time in stream mode
+DEFAULT_CHUNK_SIZE = 500
+
+# Shared by the pool workers to bound the in-flight requests of the whole run
+in_flight_semaphore = None
+# Input files parsed once by the parent process keyed by path, see init_worker
+shared_resource_files = {}
+# Characters and requests per second budgets shared by the pool workers
+rate_limiter = None
+DEFAULT_MAX_RETRIES = limiter_utils.DEFAULT_MAX_RETRIES
+# number of times a text is sent again when its placeholders were lost
+PLACEHOLDER_RETRIES = 2
 
 
 # This subroutine extracts the string including html tags
@@ -211,6 +245,8 @@ def findall_content(xml_string, tag):
 
 
 def parse_response(r, text):
+    import html
+
     # set markers that enclose the charset identifier
 
     if r is None:
@@ -223,15 +259,15 @@ def parse_response(r, text):
     parsed2 = parsed1[: parsed1.find(aftercharset)]
     # Display warning when encoding mismatch
     if parsed2 != r.encoding:
-        print("\x1b[1;31;40m" + "Warning: Potential Charset conflict")
-        print(" Encoding as extracted by SELF    : " + parsed2)
-        print(" Encoding as detected by REQUESTS : " + r.encoding + "\x1b[0m")
+        logger.warning("\x1b[1;31;40m" + "Warning: Potential Charset conflict")
+        logger.warning(" Encoding as extracted by SELF    : " + parsed2)
+        logger.warning(" Encoding as detected by REQUESTS : " + r.encoding + "\x1b[0m")
         raise ValueError
 
     # Work around an AGE OLD Python bug in case of windows-874 encoding
     # https://bugs.python.org/issue854511
     if r.encoding == "windows-874" and os.name == "posix":
-        print(
+        logger.warning(
             "\x1b[1;31;40m"
             + "Alert: Working around age old Python bug (https://bugs.python.org/issue854511)\nOn Linux, charset windows-874 must be labeled as charset cp874"
             + "\x1b[0m"
@@ -246,42 +282,234 @@ def parse_response(r, text):
     # extract translation and return it
     parsed1 = r.text[r.text.find(before_trans) + len(before_trans) :]
     parsed2 = parsed1[: parsed1.find(after_trans)]
-    # fix parameter strings
-    parsed3 = re.sub("% ([ds])", r" %\1", parsed2)
-    parsed4 = re.sub("% ([\d]) \$ ([ds])", r" %\1$\2", parsed3).strip()
-    translated_string = html.unescape(parsed4).replace("'", r"\'")
-    log(f"Translated string = {translated_string}")
+    # placeholders are protected by tokens before sending, no need to fix them
+    translated_string = html.unescape(parsed2.strip()).replace("'", r"\'")
+    logger.debug(f"Translated string = {translated_string}")
     return translated_string
 
 
-def translate_handling_newlines(
-    to_translate, to_language, language="auto", name="no-name"
+def make_batches(texts, max_count, max_chars):
+    """Splits texts into consecutive batches bounded by count and total characters.
+
+    A single text longer than max_chars is still sent, alone in its own batch.
+    """
+    batch = []
+    batch_chars = 0
+    for text in texts:
+        if batch and (len(batch) >= max_count or batch_chars + len(text) > max_chars):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append(text)
+        batch_chars = batch_chars + len(text)
+    if batch:
+        yield batch
+
+
+def init_worker(
+    semaphore,
+    resource_files=None,
+    limiter=None,
+    backend_factory=None,
+    metrics_enabled=False,
+    log_queue=None,
+    log_level=logging.INFO,
 ):
-    array_to_translate = []
-    # print(to_translate)
-    if "\\n" in to_translate:
-        log(f"{name} contains \\n so splitting text")
-        array_to_translate = to_translate.split("\\n")
-    else:
-        array_to_translate.append(to_translate)
-
-    resp_array = []
-    text_array = []
-    for text in array_to_translate:
-        print(f"text being translated(key = {name}) = {text}")
-        if text.strip():
-            # calling method for translation
-            translated_text = translate_text_from_google_api(
-                to_translate, to_language, language, name
+    """Pool initializer which shares the run wide limit of in-flight requests, the
+    rate limiter, the inputs parsed once by the parent process and the factory of
+    the translation backend, enables the metrics of the worker and sends its
+    logs to the parent process."""
+    global in_flight_semaphore, shared_resource_files, rate_limiter
+    if log_queue is not None:
+        logging_utils.init_worker_logging(log_queue, log_level)
+    in_flight_semaphore = semaphore
+    shared_resource_files = resource_files or {}
+    rate_limiter = limiter
+    if backend_factory is not None:
+        translation_backend.set_backend_factory(backend_factory)
+    if metrics_enabled:
+        metrics.enable()
+
+
+def send_batch(batch, to_language, language, max_retries=DEFAULT_MAX_RETRIES):
+    """Sends one batch to the backend, retrying with exponential backoff and jitter
+    when the backend fails with a retryable error such as an exceeded quota."""
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire(sum(map(len, batch)))
+        metrics.count(to_language, "requests")
+        metrics.count(to_language, "characters", sum(map(len, batch)))
+        start = time.perf_counter()
+        try:
+            if in_flight_semaphore is None:
+                translated_batch = translate_texts_from_backend(
+                    batch, to_language, language
+                )
+            else:
+                with in_flight_semaphore:
+                    translated_batch = translate_texts_from_backend(
+                        batch, to_language, language
+                    )
+        except Exception as e:
+            metrics.observe(to_language, "request_seconds", time.perf_counter() - start)
+            if attempt >= max_retries or not limiter_utils.is_retryable_error(e):
+                metrics.count(to_language, "failed_requests")
+                raise
+            metrics.count(to_language, "retries")
+            if rate_limiter is not None and limiter_utils.is_quota_error(e):
+                rate_limiter.slow_down()
+            delay = limiter_utils.get_backoff_delay(attempt)
+            logger.warning(
+                f"[WARNING] Batch of {len(batch)} segments for to_language = {to_language} failed with error = {e}, retrying in {delay:.1f}s"
             )
-            resp_array.append(translated_text)
-        else:
-            print(f"Text is empty")
-            resp_array.append(None)
+            time.sleep(delay)
+            attempt = attempt + 1
+            continue
+        metrics.observe(to_language, "request_seconds", time.perf_counter() - start)
+        if rate_limiter is not None:
+            rate_limiter.speed_up()
+        return translated_batch
 
-        text_array.append(text)
 
-    return "\\n".join(resp_array)
+def translate_batch(batch, to_language, language, max_retries=DEFAULT_MAX_RETRIES):
+    """Translates one batch with its placeholders and markup replaced by tokens,
+    so the backend can't mangle them, and puts them back in the translations.
+
+    The texts whose tokens didn't survive are sent again up to
+    PLACEHOLDER_RETRIES times, the returned list holds None for the texts which
+    still fail. A text made only of placeholders is kept as it is.
+    """
+    protected_batch = [placeholders.protect(text) for text in batch]
+    translated_batch = [None] * len(batch)
+    to_send = []
+    for i, protected in enumerate(protected_batch):
+        if placeholders.has_text(protected):
+            to_send.append(i)
+        else:
+            translated_batch[i] = batch[i]
+
+    attempt = 0
+    while to_send:
+        results = send_batch(
+            [protected_batch[i].text for i in to_send],
+            to_language,
+            language,
+            max_retries,
+        )
+        failed = []
+        for i, result in zip(to_send, results):
+            translated_batch[i] = placeholders.restore(protected_batch[i], result)
+            if translated_batch[i] is None:
+                logger.debug(
+                    f"Placeholders of {batch[i]} were lost in translation = {result}"
+                )
+                failed.append(i)
+        if failed:
+            metrics.count(to_language, "lost_placeholders", len(failed))
+        if failed and attempt < PLACEHOLDER_RETRIES:
+            logger.warning(
+                f"[WARNING] {len(failed)} segments for to_language = {to_language} lost their placeholders, retrying them"
+            )
+        elif failed:
+            logger.error(
+                f"[ERROR] {len(failed)} segments for to_language = {to_language} lost their placeholders after {attempt + 1} attempts"
+            )
+            break
+        to_send = failed
+        attempt = attempt + 1
+    return translated_batch
+
+
+def translate_texts(
+    to_translate_list,
+    to_language,
+    language="auto",
+    batch_size=MAX_BATCH_SIZE,
+    batch_chars=MAX_BATCH_CHARS,
+    memory=None,
+    threads=DEFAULT_THREADS,
+    max_retries=DEFAULT_MAX_RETRIES,
+    known_segments=None,
+    journal=None,
+):
+    """Translates a list of texts with as few service calls as possible.
+
+    Every text is split into segments at its line breaks, the segments of
+    known_segments (already translated by the parent process) and the ones found
+    in the translation memory are reused and the remaining unique non-empty
+    segments of all the texts are sent in bounded batches, the translated
+    segments are joined back per text with the original separators.
+    Up to threads batches are in flight at the same time and every translated
+    batch is recorded in the journal as soon as it completes.
+    The returned list is aligned with to_translate_list and contains None for
+    the texts whose segments could not be translated.
+    """
+    segmented_texts = []
+    segments = []
+    for to_translate in to_translate_list:
+        segmented = segmenter.split(to_translate)
+        if segmented.separators:
+            logger.debug(f"{to_translate} contains line breaks so splitting text")
+        segmented_texts.append(segmented)
+        segments.extend(segmenter.get_translatable_segments(segmented))
+    # a segment repeated under several keys is sent once
+    segments = list(dict.fromkeys(segments))
+
+    translated_segments = {}
+    if known_segments:
+        translated_segments = {
+            segment: known_segments[segment]
+            for segment in segments
+            if segment in known_segments
+        }
+        segments = [
+            segment for segment in segments if segment not in translated_segments
+        ]
+    if memory is not None and segments:
+        translated_segments.update(memory.lookup(segments, language, to_language))
+        logger.debug(
+            f"Translation memory has {len(translated_segments)} segments for to_language = {to_language}"
+        )
+        segments = [
+            segment for segment in segments if segment not in translated_segments
+        ]
+
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as executor:
+        future_to_batch = {}
+        for batch in make_batches(segments, batch_size, batch_chars):
+            logger.debug(
+                f"Sending batch of {len(batch)} segments for to_language = {to_language}"
+            )
+            future = executor.submit(
+                translate_batch, batch, to_language, language, max_retries
+            )
+            future_to_batch[future] = batch
+
+        # results are collected on this thread as they complete, they are keyed
+        # by segment so the document order is restored when joining them back
+        for future in as_completed(future_to_batch):
+            batch = future_to_batch[future]
+            try:
+                translated_batch = {
+                    segment: translated
+                    for segment, translated in zip(batch, future.result())
+                    if translated is not None
+                }
+                translated_segments.update(translated_batch)
+                if memory is not None:
+                    memory.store(translated_batch, language, to_language)
+                if journal is not None:
+                    journal.record(translated_batch)
+            except Exception as e:
+                logger.error(
+                    f"[ERROR] Batch of {len(batch)} segments failed to be translated with error = {e}, for out_lang_code = {to_language}",
+                    exc_info=logger.isEnabledFor(logging.DEBUG),
+                )
+
+    return [
+        segmenter.join(segmented, translated_segments) for segmented in segmented_texts
+    ]
 
 
 def perform_asserts_on_text(text):
@@ -298,6 +526,9 @@ def translate_text_from_google_web(
     """This subroutine calls Google translate and extracts the translation from
     the html request. This method is flaky
     """
+    # only this backend needs requests, the runs using the others don't import it
+    import requests
+    import urllib.parse
 
     perform_asserts_on_text(to_translate)
 
@@ -307,17 +538,37 @@ def translate_text_from_google_web(
         language,
         urllib.parse.quote(to_translate),
     )
-    log("\nrequest url = " + req_url)
+    logger.debug("request url = " + req_url)
 
     # Making fake user-agent
     # ua = UserAgent(use_cache_server=False,verify_ssl=False)
     # userAgent = ua.random
-    # log(f'Randm userAgent = {userAgent}')
+    # logger.debug(f'Randm userAgent = {userAgent}')
     # headers = {"User-Agent": userAgent}
     # cookies = {'GOOGLE_ABUSE_EXEMPTION': 'ID=196d8fb1efebf14e:TM=1601733587:C=r:IP=103.43.112.97-:S=APGng0vxwhbunwAPfP8XSWk9jHovjubUfQ'}
     # headers=headers, cookies=cookies
 
-    return parse_response(requests.get(req_url))
+    return parse_response(requests.get(req_url), to_translate)
+
+
+class GoogleWebBackend(translation_backend.TranslationBackend):
+    """Scrapes the mobile page of Google translate, one request per text. It needs
+    no credentials but is flaky."""
+
+    name = "google-web"
+
+    def translate(self, texts, to_language, from_language):
+        return [
+            translate_text_from_google_web(text, to_language, from_language)
+            for text in texts
+        ]
+
+
+BACKENDS = {
+    translation_backend.GoogleApiBackend.name: translation_backend.create_google_api_backend,
+    GoogleWebBackend.name: GoogleWebBackend,
+    translation_backend.PseudoLocBackend.name: translation_backend.PseudoLocBackend,
+}
 
 
 def getIso639LangCode(android_lang_code):
@@ -335,56 +586,39 @@ def getIso639LangCode(android_lang_code):
         return android_lang_code
 
 
-def translate_text_from_google_api(
-    to_translate, to_language, input_lang, name="no-name"
-):
-    """Translates text into the target language.
+def translate_texts_from_backend(to_translate_list, to_language, input_lang):
+    """Translates a batch of texts into the target language with a single call to
+    the translation backend of this process.
 
     Target must be an ISO 639-1 language code.
     See https://g.co/cloud/translate/v2/translate-reference#supported_languages
     """
 
-    perform_asserts_on_text(to_translate)
-    log(
-        f"Resource value with name = {name}, going to call google api call and text = {to_translate} and to_language = {to_language}"
+    for to_translate in to_translate_list:
+        perform_asserts_on_text(to_translate)
+    logger.debug(
+        f"Going to call translation backend for {len(to_translate_list)} texts and to_language = {to_language}"
     )
 
-    env_key_name = "GOOGLE_APPLICATION_SERVICE_ACCOUNT_CREDENTIALS_FOR_TRANSLATION"
-    assert (
-        env_key_name in os.environ
-    ), f"{env_key_name} is not present in os environment variables. You may have to restart to your application if this variable is just added"
-
-    path_for_service_key_for_translation = os.environ[env_key_name]
-    log(
-        f"Returned env variable for service key path = {path_for_service_key_for_translation}"
-    )
-    assert (
-        path_for_service_key_for_translation.strip()
-    ), f"Environment path is not set for {env_key_name}"
-    assert os.path.exists(
-        path_for_service_key_for_translation
-    ), f"File doesn't exists for path {path_for_service_key_for_translation} which is set by {env_key_name}"
-
-    translate_client = google_translate_sdk.Client.from_service_account_json(
-        path_for_service_key_for_translation
-    )
-    if isinstance(to_translate, six.binary_type):
-        log(
-            f"Resource value with name = {name}, is not of type six.binary_type so decoding it"
+    to_translate_list = [
+        (
+            to_translate.decode("utf-8")
+            if isinstance(to_translate, bytes)
+            else to_translate
         )
-        to_translate = to_translate.decode("utf-8")
-        log(f"Resource value with name = {name}, new decoded value = {to_translate}")
+        for to_translate in to_translate_list
+    ]
 
-    # Text can also be a sequence of strings, in which case this method
-    # will return a sequence of results for each text.
     iso_639_lang_code = getIso639LangCode(to_language)
-    log(f"Resource value with name = {name}, iso_639_lang_code = {iso_639_lang_code}")
-    result = translate_client.translate(to_translate, target_language=iso_639_lang_code)
-    translated_text = result["translatedText"]
-    print(
-        f'Translation returned from Google service for name {name} = {translated_text} for input text = {result["input"]}, detected language = {result["detectedSourceLanguage"]}'
+    logger.debug(f"iso_639_lang_code = {iso_639_lang_code}")
+    translated_texts = translation_backend.get_backend().translate(
+        to_translate_list, iso_639_lang_code, input_lang
     )
-    return translated_text
+    for to_translate, translated_text in zip(to_translate_list, translated_texts):
+        logger.debug(
+            f"Translation returned from backend = {translated_text} for input text = {to_translate}"
+        )
+    return translated_texts
 
 
 #
@@ -396,12 +630,12 @@ def translate_text_from_google_api(
 
 def make_folder(folder_name, overrite=False):
     if not os.path.exists(folder_name):
-        print(f"Make folder {folder_name}")
+        logger.debug(f"Make folder {folder_name}")
         os.makedirs(folder_name)
         return True
     else:
         if overrite:
-            print(f"Make folder already exist {folder_name}")
+            logger.debug(f"Make folder already exist {folder_name}")
             shutil.rmtree(folder_name)
             os.makedirs(folder_name)
             return True
@@ -410,240 +644,671 @@ def make_folder(folder_name, overrite=False):
 
 
 def print_element(initial_text, translated_text, name):
-    log(f"[{name}] {initial_text} -> {translated_text}")
+    logger.debug(f"[{name}] {initial_text} -> {translated_text}")
 
 
-def translate_node(input_node, out_lang, in_lang, name):
-    is_translatable = input_node.get("translatable") != "false"
-    log(
-        f"translate_node is called and key = {name} is found to be translatable = {is_translatable}"
+def get_text_to_translate(input_node, name):
+    """Returns the text of input_node, a ResourceEntry or ResourceItem, which has
+    to be translated or None when the node is not translatable. Nothing is
+    translated here, the texts are collected and sent later in batches by
+    translate_texts.
+    """
+    is_translatable = resources.is_translatable(input_node.attrib)
+    logger.debug(
+        f"get_text_to_translate is called and key = {name} is found to be translatable = {is_translatable}"
     )
-    # Translating the string tag
     if is_translatable:
-        # Here you might want to replace root[i].text by the findall_content function
-        # if you need to extract html tags
-        # ~ totranslate="".join(findall_content(str(ET.tostring(root[i])),"string"))
         to_translate = input_node.text
         assert to_translate is not None, f"Input text is found to None for key = {name}"
-        try:
-            translation_result = translate_handling_newlines(
-                to_translate, out_lang, in_lang, name
-            )
-            print_element(to_translate, translation_result, name)
-            return translation_result
-        except Exception as e:
-            traceback.print_exc()
-            print(
-                f"[ERROR] Key with name = {name} failed to be translated with error = {e}, for out_lang_code = {out_lang} and text = {to_translate}"
-            )
-            return None
+        return to_translate
     else:
         return None
 
 
-def get_previous_string(root, id):
+def get_previous_string(index, id):
     assert type(id) is str, f"In get_previous_string, id is found to be None"
-    if root is None:
-        return None
-    answer_list = root.findall(f".//string[@name='{id}']")
-    if len(answer_list) == 0:
-        return None
-    else:
-        return answer_list[0].text
+    return index.get(("string", id))
 
 
-def get_previous_string_item(tag, root, id, index):
+def get_previous_string_item(tag, index, id, item_key):
     assert type(id) is str, f"In get_previous_string_item id is not string. id = ${id}"
-    if root is None:
-        return None
-    answer_list = root.findall(f".//{tag}[@name='{id}']")
-    if len(answer_list) == 0 or len(answer_list[0]) < index + 1:
+    previous_items = index.get((tag, id))
+    if previous_items is None:
         return None
+    previous_item_text = previous_items.get(item_key)
+    if previous_item_text:
+        return previous_item_text
     else:
-        previous_item_text = answer_list[0][index].text
-        if previous_item_text:
-            return previous_item_text
-        else:
-            return None
+        return None
 
 
 def log_reason_for_translation_req(
     index, previous_translated_text, input_string_id, input_text, file_identifier
 ):
-    if previous_translated_text is None:
-        log(
+    if previous_translated_text is not None and previous_translated_text != input_text:
+        logger.debug(
+            f"{index}: Not skipping translation for {input_string_id} as the english text changed since values-{file_identifier}/strings.xml was translated or translation is forced"
+        )
+    elif previous_translated_text is None:
+        logger.debug(
             f"{index}: Not skipping translation for {input_string_id} as in values-{file_identifier}/strings.xml, previous translation not found"
         )
     elif previous_translated_text == input_text:
-        log(
+        logger.debug(
             f"{index}: Not skipping translation for {input_string_id} as previous translated text(={previous_translated_text}) present at values-{file_identifier}/strings.xml is exactly same, so it must be copy of english text"
         )
 
 
-def should_translate(previous_translation, input_text):
-    return previous_translation is None or previous_translation == input_text
-
-
-def make_other_lang_string_file(
-    in_lang,
-    out_lang_folder_prefix_pair,
-    in_file_path,
-    out_folder_path,
-    forced,
-    debug_local,
+def should_translate(
+    previous_translation, input_text, previous_source_hash=None, forced=False
 ):
-    global debug
-    debug = debug_local
-    out_lang_code = out_lang_folder_prefix_pair[0]
-    folder_suffix = out_lang_folder_prefix_pair[1]
-    # create outfile name by appending the language code to the input file name
-    # print('in_lang = {0}, out_lang = {1}, in_file_path = {2} and out_folder_path = {3}'.format(in_lang, out_lang, in_file_path, out_folder_path))
-    _, tail = os.path.split(in_file_path)
-    out_file_path = os.path.join(
-        out_folder_path,
-        f"values-{folder_suffix}",
-        tail,
+    """previous_source_hash is the hash of the source text the previous translation
+    was made from, as recorded in the sources manifest of the output file."""
+    if forced or previous_translation is None or previous_translation == input_text:
+        return True
+    return previous_source_hash is not None and previous_source_hash != (
+        source_manifest.hash_text(input_text)
     )
 
-    print(f"\n\nMaking values-{folder_suffix} folder at {out_file_path}")
-    print(f"Trying to Making values-{folder_suffix}")
-    if make_folder(os.path.dirname(out_file_path)):
-        f"Successfully created folder at {out_file_path}"
-    else:
-        f"Folder was already present at {out_file_path}"
-    print("\n")
 
-    # read xml structure
-    print(f"Input string file name = {in_file_path}\n")
-    input_tree = ET.parse(in_file_path)
-    input_tree_root = input_tree.getroot()
-    input_tree_working = copy.deepcopy(input_tree)
-    input_tree_root_working = input_tree_working.getroot()
+def collect_pending_translations(
+    entries,
+    start_index,
+    output_index,
+    previous_sources,
+    sources,
+    forced,
+    folder_suffix,
+):
+    """First phase: copies the previous translations and collects every text of
+    entries which needs to be translated.
 
-    # trying to read output xml if that exists
-    if os.path.exists(out_file_path):
-        log(f"File path values-{folder_suffix} does contain the strings.xml")
-        output_tree = ET.parse(out_file_path)
-        output_tree_root = output_tree.getroot()
-    else:
-        output_tree = None
-        output_tree_root = None
-        log(f"File path values-{folder_suffix} doesn't contain the strings.xml")
-
-    # cycle through elements
-    working_index = 0
-    for i in range(len(input_tree_root)):
-        # for each translatable string call the translation subroutine
-        # and replace the string by its translation,
+    Returns (pending, output_texts, dropped), output_texts is aligned with the
+    entries and holds the text of a string or the item texts of a string-array
+    or plurals, dropped holds the indices of the strings left out of the output.
+    """
+    pending = []
+    output_texts = []
+    dropped = set()
+    for i, entry in enumerate(entries, start_index):
+        # for each translatable string collect it for the translation
+        # and replace the string by its previous translation,
         # descend into each string array
-        log("\n")
-
-        input_node = input_tree_root[i]
-        output_node = input_tree_root_working[working_index]
+        output_texts.append(entry.text)
 
         # If comment then continue
-        if not isinstance(input_node.tag, str):
-            working_index = working_index + 1
+        if entry.tag == resources.COMMENT_TAG:
             continue
 
-        string_id = input_node.attrib["name"]
-        print(f"{i}: Resource value with name = {string_id}, checking")
+        string_id = entry.name
+        logger.debug(f"{i}: Resource value with name = {string_id}, checking")
         # Translating the string tag
-        if input_node.tag == "string":
-            print(f"{i}: Resource value with id = {string_id}, found to be string")
+        if entry.tag == "string":
+            logger.debug(
+                f"{i}: Resource value with id = {string_id}, found to be string"
+            )
 
-            if not input_node.text.startswith("@string/"):
-                previous_translated_text = get_previous_string(
-                    output_tree_root, string_id
-                )
+            if not entry.text.startswith("@string/"):
+                previous_translated_text = get_previous_string(output_index, string_id)
+                manifest_key = source_manifest.make_key(entry.tag, string_id)
                 if should_translate(
                     previous_translation=previous_translated_text,
-                    input_text=input_node.text,
+                    input_text=entry.text,
+                    previous_source_hash=previous_sources.get(manifest_key),
+                    forced=forced,
                 ):
                     log_reason_for_translation_req(
                         i,
                         previous_translated_text,
                         input_string_id=string_id,
-                        input_text=input_node.text,
+                        input_text=entry.text,
                         file_identifier=folder_suffix,
                     )
-                    translated_result = translate_node(
-                        input_node, out_lang_code, in_lang, string_id
-                    )
-                    if translated_result is not None:
-                        print(
-                            f"{i}: Resource value with name = {string_id}, we are able to complete the translation and result is = {translated_result}"
+                    if get_text_to_translate(entry, string_id) is not None:
+                        pending.append(
+                            PendingTranslation(
+                                i - start_index,
+                                None,
+                                string_id,
+                                entry.text,
+                                manifest_key,
+                                previous_translated_text,
+                            )
                         )
-                        output_node.text = translated_result
                     else:
-                        if input_node.get("translatable") == "true":
-                            # Only logging when translatable is true o/w for false value is expected
-                            log(
-                                f"{i}: [ERROR] Resource value with name = {string_id}, we are NOT able to complete the translation"
-                            )
-                        input_tree_root_working.remove(output_node)
-                        working_index = working_index - 1
+                        dropped.add(i - start_index)
                 else:
-                    print(
+                    logger.debug(
                         f"{i}: Resource value with name = {string_id}, skipped as previous translation(= {previous_translated_text}) was found"
                     )
-                    output_node.text = previous_translated_text
+                    output_texts[i - start_index] = previous_translated_text
+                    sources[manifest_key] = source_manifest.hash_text(entry.text)
             else:
-                print(
+                logger.debug(
                     f"{i}: Resource value with name = {string_id}, skipped as it is @string/* type value"
                 )
         else:
-            print(
+            logger.debug(
                 f"{i}: Resource value with name = {string_id}, skipped as it is not string may be handled in string-array or plurals"
             )
 
         # Translating the string-array tag
-        if input_node.tag == "string-array" or input_node.tag == "plurals":
-            log(f"processing {input_node.tag}")
-
-            for j in range(len(input_node)):
-                # for each translatable string call the translation subroutine
-                # and replace the string by its translation,
-
-                assert (
-                    input_node[j].tag == "item"
-                ), f"For {j} index of the type = {input_node.tag} is not item"
-                if not input_node[j].text.startswith("@string/"):
+        if resources.is_item_container(entry.tag):
+            logger.debug(f"processing {entry.tag}")
+            output_texts[i - start_index] = [item.text for item in entry.items]
+
+            for j, item in enumerate(entry.items):
+                # for each translatable string collect it for the translation
+                # and replace the string by its previous translation,
+                if not item.text.startswith("@string/"):
                     previous_string = get_previous_string_item(
-                        input_node.tag, output_tree_root, string_id, j
+                        entry.tag, output_index, string_id, item.key
+                    )
+                    manifest_key = source_manifest.make_key(
+                        entry.tag, string_id, item.key
                     )
                     if should_translate(
                         previous_translation=previous_string,
-                        input_text=input_node[j].text,
+                        input_text=item.text,
+                        previous_source_hash=previous_sources.get(manifest_key),
+                        forced=forced,
                     ):
                         log_reason_for_translation_req(
                             index=i,
                             file_identifier=folder_suffix,
                             input_string_id=string_id,
-                            input_text=input_node[j].text,
+                            input_text=item.text,
                             previous_translated_text=previous_string,
                         )
-                        output_node[j].text = translate_node(
-                            input_node[j],
-                            out_lang_code,
-                            in_lang,
-                            input_node.attrib["name"],
-                        )
+                        if get_text_to_translate(item, string_id) is not None:
+                            pending.append(
+                                PendingTranslation(
+                                    i - start_index,
+                                    j,
+                                    string_id,
+                                    item.text,
+                                    manifest_key,
+                                    previous_string,
+                                )
+                            )
+                        else:
+                            output_texts[i - start_index][j] = None
                     else:
-                        output_node[j].text = previous_string
+                        output_texts[i - start_index][j] = previous_string
+                        sources[manifest_key] = source_manifest.hash_text(item.text)
 
-        working_index = working_index + 1
-        log(
+        logger.debug(
             f"{i}: Resource value with name = {string_id}, end processing for this node"
         )
 
+    return pending, output_texts, dropped
+
+
+def apply_translations(
+    pending,
+    translated_results,
+    output_texts,
+    dropped,
+    previous_sources,
+    sources,
+    out_lang_code,
+):
+    """Third phase: maps the translations back onto the output, a failed key keeps
+    its previous translation and the source hash of it, if there is one, so that
+    it is retried next time."""
+    for it, translated_result in zip(pending, translated_results):
+        print_element(it.text, translated_result, it.name)
+        if translated_result is not None:
+            logger.debug(
+                f"{it.index}: Resource value with name = {it.name}, we are able to complete the translation and result is = {translated_result}"
+            )
+            sources[it.manifest_key] = source_manifest.hash_text(it.text)
+        else:
+            logger.error(
+                f"[ERROR] Key with name = {it.name} failed to be translated, for out_lang_code = {out_lang_code} and text = {it.text}"
+            )
+            translated_result = it.previous_translation
+            if it.manifest_key in previous_sources:
+                sources[it.manifest_key] = previous_sources[it.manifest_key]
+        if it.item_index is not None:
+            output_texts[it.index][it.item_index] = translated_result
+        elif translated_result is not None:
+            output_texts[it.index] = translated_result
+        else:
+            dropped.add(it.index)
+
+
+def iter_chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# One input file with its output folder and the (lang code, values folder
+# suffix) pairs it is translated to
+Target = namedtuple("Target", ["in_file_path", "out_folder_path", "lang_pairs"])
+
+
+def get_lang_pairs(lang):
+    return list(
+        map(lambda it: (it.strip().split("-")[0], it.strip()), str(lang).split(","))
+    )
+
+
+def iter_target_languages(targets):
+    """Yields (target, (lang code, values folder suffix)) of every language of
+    every target, each one is a task of the pool."""
+    for target in targets:
+        for pair in target.lang_pairs:
+            yield target, pair
+
+
+def get_fingerprint_path(in_file_path, out_folder_path, folder_suffix):
+    return string_fileutils.get_state_file_path(
+        out_folder_path,
+        f"values-{folder_suffix}",
+        os.path.basename(in_file_path),
+        fingerprint.FINGERPRINT_SUFFIX,
+    )
+
+
+def get_journal_path(in_file_path, out_folder_path, out_lang_code):
+    """The journal is kept per language code, it is shared by the values folders
+    of the language (e.g. de and de-rAT)."""
+    return string_fileutils.get_state_file_path(
+        out_folder_path,
+        translation_journal.JOURNAL_FOLDER_NAME,
+        f"{os.path.basename(in_file_path)}.{out_lang_code}",
+        translation_journal.JOURNAL_SUFFIX,
+    )
+
+
+def read_previous_output(in_file_path, out_folder_path, folder_suffix):
+    """Returns (output_index, manifest_path, previous_sources) of the output file
+    of values-folder_suffix, the index is empty when the file doesn't exist."""
+    out_file_path = project_targets.get_out_file_path(
+        in_file_path, out_folder_path, folder_suffix
+    )
+    # trying to read output xml if that exists
+    if os.path.exists(out_file_path):
+        logger.debug(f"File path values-{folder_suffix} does contain the strings.xml")
+        output_index = resource_index.build_resource_index_from_file(out_file_path)
+    else:
+        output_index = {}
+        logger.debug(
+            f"File path values-{folder_suffix} doesn't contain the strings.xml"
+        )
+
+    # the sources manifest records the hash of the english text each translation
+    # was made from, so that translations of changed english texts are redone
+    manifest_path = string_fileutils.get_state_file_path(
+        out_folder_path,
+        f"values-{folder_suffix}",
+        os.path.basename(in_file_path),
+        source_manifest.MANIFEST_SUFFIX,
+    )
+    return output_index, manifest_path, source_manifest.load_manifest(manifest_path)
+
+
+@logging_utils.flush_after
+def plan_language(
+    in_lang, out_lang_folder_prefix_pair, in_file_path, out_folder_path, forced
+):
+    """Returns (keys, segments, metrics), the number of texts and the unique
+    non-empty segments which have to be translated for values-folder_suffix,
+    without translating or writing anything."""
+    folder_suffix = out_lang_folder_prefix_pair[1]
+    with metrics.timer(f"values-{folder_suffix}", "lookup"):
+        output_index, _, previous_sources = read_previous_output(
+            in_file_path, out_folder_path, folder_suffix
+        )
+    with metrics.timer(f"values-{folder_suffix}", "plan"):
+        pending, _, _ = collect_pending_translations(
+            shared_resource_files[in_file_path].entries,
+            0,
+            output_index,
+            previous_sources,
+            {},
+            forced,
+            folder_suffix,
+        )
+    segments = {}
+    for it in pending:
+        segments.update(
+            dict.fromkeys(segmenter.get_translatable_segments(segmenter.split(it.text)))
+        )
+    logger.debug(f"Planned {len(segments)} segments for values-{folder_suffix}")
+    return len(pending), list(segments), metrics.collect()
+
+
+@logging_utils.flush_after
+def translate_segments(
+    in_lang,
+    out_lang_code,
+    segments,
+    batch_size=MAX_BATCH_SIZE,
+    batch_chars=MAX_BATCH_CHARS,
+    memory_path=None,
+    threads=DEFAULT_THREADS,
+    max_retries=DEFAULT_MAX_RETRIES,
+    journal_path=None,
+):
+    """Translates the deduplicated segments of every language sharing out_lang_code.
+
+    Returns (translated, stats), translated maps each segment to its translation
+    and leaves out the segments which failed so that the language workers retry
+    them on their own.
+    """
+    memory = None
+    if memory_path:
+        memory = translation_memory.TranslationMemory(memory_path)
+    journal = None
+    if journal_path:
+        journal = translation_journal.Journal(journal_path)
+    try:
+        with metrics.timer(out_lang_code, "translate"):
+            results = translate_texts(
+                segments,
+                out_lang_code,
+                in_lang,
+                batch_size,
+                batch_chars,
+                memory,
+                threads,
+                max_retries,
+                None,
+                journal,
+            )
+    finally:
+        if memory is not None:
+            memory.close()
+        if journal is not None:
+            journal.close()
+    translated = {
+        segment: result
+        for segment, result in zip(segments, results)
+        if result is not None
+    }
+    logger.debug(
+        f"Translated {len(translated)} of {len(segments)} unique segments for out_lang_code = {out_lang_code}"
+    )
+    stats = {"memory_hits": 0, "memory_misses": 0, "metrics": metrics.collect()}
+    if memory is not None:
+        stats["memory_hits"] = memory.hits
+        stats["memory_misses"] = memory.misses
+    return translated, stats
+
+
+@logging_utils.flush_after
+def make_other_lang_string_file(
+    in_lang,
+    out_lang_folder_prefix_pair,
+    in_file_path,
+    out_folder_path,
+    forced,
+    batch_size=MAX_BATCH_SIZE,
+    batch_chars=MAX_BATCH_CHARS,
+    memory_path=None,
+    threads=DEFAULT_THREADS,
+    resource_file=None,
+    max_retries=DEFAULT_MAX_RETRIES,
+    stream=False,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    known_segments=None,
+    source_hash=None,
+):
+    out_lang_code = out_lang_folder_prefix_pair[0]
+    folder_suffix = out_lang_folder_prefix_pair[1]
+    language_label = f"values-{folder_suffix}"
+    # create outfile name by appending the language code to the input file name
+    # print('in_lang = {0}, out_lang = {1}, in_file_path = {2} and out_folder_path = {3}'.format(in_lang, out_lang, in_file_path, out_folder_path))
+    out_file_path = project_targets.get_out_file_path(
+        in_file_path, out_folder_path, folder_suffix
+    )
+
+    logger.debug(f"Making values-{folder_suffix} folder at {out_file_path}")
+    if make_folder(os.path.dirname(out_file_path)):
+        f"Successfully created folder at {out_file_path}"
+    else:
+        f"Folder was already present at {out_file_path}"
+
+    if source_hash is None:
+        source_hash = fingerprint.hash_file(in_file_path)
+
+    # read xml structure, the parent process shares the already parsed input.
+    # In stream mode the input is read and the output written chunk by chunk
+    if stream:
+        resource_file = resources.ResourceStream(in_file_path)
+        chunks = iter_chunks(resource_file, chunk_size)
+    else:
+        if resource_file is None:
+            resource_file = shared_resource_files.get(in_file_path)
+        if resource_file is None:
+            logger.debug(f"Input string file name = {in_file_path}\n")
+            with metrics.timer(language_label, "parse"):
+                resource_file = resources.parse_resource_file(in_file_path)
+        chunks = [resource_file.entries]
+
+    with metrics.timer(language_label, "lookup"):
+        output_index, manifest_path, previous_sources = read_previous_output(
+            in_file_path, out_folder_path, folder_suffix
+        )
+    sources = {}
+
+    memory = None
+    journal = None
+    failed = []
+    # the chunks are translated while the file is written, the time spent in
+    # process_chunks is left out of the write phase
+    chunks_seconds = 0
+    pending_count = 0
+
+    def process_chunks():
+        nonlocal memory, journal, chunks_seconds, pending_count
+        start_index = 0
+        for entries in chunks:
+            chunk_start = time.perf_counter()
+            with metrics.timer(language_label, "plan"):
+                pending, output_texts, dropped = collect_pending_translations(
+                    entries,
+                    start_index,
+                    output_index,
+                    previous_sources,
+                    sources,
+                    forced,
+                    folder_suffix,
+                )
+            metrics.count(language_label, "keys", len(pending))
+            pending_count = pending_count + len(pending)
+
+            # second phase: translate all the collected texts in batches, the
+            # backend and the translation memory are not even opened when
+            # nothing is pending
+            logger.debug(
+                f"Translating {len(pending)} values for values-{folder_suffix}"
+            )
+            translated_results = []
+            if pending:
+                if memory_path and memory is None:
+                    memory = translation_memory.TranslationMemory(memory_path)
+                if journal is None:
+                    journal = translation_journal.Journal(
+                        get_journal_path(in_file_path, out_folder_path, out_lang_code)
+                    )
+                with metrics.timer(language_label, "translate"):
+                    translated_results = translate_texts(
+                        [it.text for it in pending],
+                        out_lang_code,
+                        in_lang,
+                        batch_size,
+                        batch_chars,
+                        memory,
+                        threads,
+                        max_retries,
+                        known_segments,
+                        journal,
+                    )
+
+            apply_translations(
+                pending,
+                translated_results,
+                output_texts,
+                dropped,
+                previous_sources,
+                sources,
+                out_lang_code,
+            )
+            failed.extend(
+                it.name
+                for it, result in zip(pending, translated_results)
+                if result is None
+            )
+            chunks_seconds = chunks_seconds + time.perf_counter() - chunk_start
+            yield entries, output_texts, dropped
+            start_index = start_index + len(entries)
+
     # write new xml file
-    print(f"Writing to fileName = {out_file_path}")
-    input_tree_working.write(out_file_path, encoding="utf-8", xml_declaration=True)
+    logger.debug(f"Writing to fileName = {out_file_path}")
+    write_start = time.perf_counter()
+    try:
+        changed = resources.write_resource_file(
+            out_file_path, resource_file, process_chunks()
+        )
+    finally:
+        if memory is not None:
+            memory.close()
+        if journal is not None:
+            journal.close()
+    source_manifest.save_manifest(manifest_path, sources)
+    # the failed keys have to be retried by the next run, which can't be skipped
+    fingerprint_path = get_fingerprint_path(
+        in_file_path, out_folder_path, folder_suffix
+    )
+    if failed:
+        fingerprint.discard_fingerprint(fingerprint_path)
+    else:
+        fingerprint.save_fingerprint(
+            fingerprint_path, source_hash, fingerprint.hash_file(out_file_path)
+        )
+    metrics.add_time(
+        language_label, "write", time.perf_counter() - write_start - chunks_seconds
+    )
+    metrics.count(language_label, "failed", len(failed))
+    logger.info(
+        f"values-{folder_suffix}: {pending_count - len(failed)} values translated, {len(failed)} failed, {'written to' if changed else 'no change in'} {out_file_path}"
+    )
+
+    stats = {
+        "memory_hits": 0,
+        "memory_misses": 0,
+        "failed": failed,
+        "metrics": metrics.collect(),
+    }
+    if memory is not None:
+        stats["memory_hits"] = memory.hits
+        stats["memory_misses"] = memory.misses
+        logger.debug(
+            f"Translation memory for values-{folder_suffix}: hits = {memory.hits}, misses = {memory.misses}"
+        )
+    return stats
+
+
+def estimate_work(
+    in_lang,
+    targets,
+    forced,
+    batch_size=MAX_BATCH_SIZE,
+    batch_chars=MAX_BATCH_CHARS,
+    memory_path=None,
+):
+    """Dry run of the translation: returns the keys, segments, characters, memory
+    hits and batches each language would need, and the totals of the run in
+    which the segments shared by languages are sent once.
+
+    Nothing is translated or written and no credentials are needed.
+    """
+    init_worker(
+        None,
+        {
+            it.in_file_path: resources.parse_resource_file(it.in_file_path)
+            for it in targets
+        },
+    )
+    memory = None
+    if memory_path and os.path.exists(memory_path):
+        memory = translation_memory.TranslationMemory(memory_path)
+
+    def estimate(out_lang_code, segments):
+        found = {}
+        if memory is not None:
+            found = memory.lookup(segments, in_lang, out_lang_code, peek=True)
+        to_send = [segment for segment in segments if segment not in found]
+        return {
+            "segments": len(segments),
+            "characters": sum(map(len, to_send)),
+            "memory_hits": len(found),
+            "batches": len(list(make_batches(to_send, batch_size, batch_chars))),
+        }
+
+    languages = []
+    segments_per_code = {}
+    try:
+        for target, (out_lang_code, folder_suffix) in iter_target_languages(targets):
+            keys, segments, _ = plan_language(
+                in_lang,
+                (out_lang_code, folder_suffix),
+                target.in_file_path,
+                target.out_folder_path,
+                forced,
+            )
+            segments_per_code.setdefault(out_lang_code, {}).update(
+                dict.fromkeys(segments)
+            )
+            languages.append(
+                {
+                    "values_folder": f"values-{folder_suffix}",
+                    "file": project_targets.get_out_file_path(
+                        target.in_file_path, target.out_folder_path, folder_suffix
+                    ),
+                    "lang_code": out_lang_code,
+                    "keys": keys,
+                    **estimate(out_lang_code, segments),
+                }
+            )
+        total = {"keys": sum(it["keys"] for it in languages)}
+        for code_estimate in (
+            estimate(code, list(segments))
+            for code, segments in segments_per_code.items()
+        ):
+            for name, value in code_estimate.items():
+                total[name] = total.get(name, 0) + value
+    finally:
+        if memory is not None:
+            memory.close()
+    return {"languages": languages, "total": total}
+
+
+def format_plan(plan):
+    lines = []
+    # the values folders of a project are told apart by their files
+    label = "values_folder"
+    if len({it["file"] for it in plan["languages"]}) > len(
+        {it["values_folder"] for it in plan["languages"]}
+    ):
+        label = "file"
+    for it in plan["languages"] + [
+        dict(plan["total"], values_folder="Total", file="Total")
+    ]:
+        lines.append(
+            f"{it[label]}: keys = {it['keys']}, segments = {it['segments']}, characters = {it['characters']}, memory hits = {it['memory_hits']}, batches = {it['batches']}"
+        )
+    return "\n".join(lines)
 
 
 def main(argv):
-    global debug
     parser = argparse.ArgumentParser(
         description="This is a python module to automatically make string.xml file for different languages for Android"
     )
@@ -653,11 +1318,16 @@ def main(argv):
         default="",
         help="specify the absolute path of the output folder. Default absolute path will be parent folder of the folder containing the strings.xml file",
     )
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         "-i",
         action="store",
         help="specify the absolute path of input file",
-        required=True,
+    )
+    input_group.add_argument(
+        "-project",
+        action="store",
+        help="specify the absolute path of a project to translate the string resource files of all its modules in one run, every file is translated in the res folder of its module and the lang codes default to the values folders of each module",
     )
     parser.add_argument(
         "-lang",
@@ -679,63 +1349,519 @@ def main(argv):
         type=int,
         help="set the number of process pool to use, default = 5",
     )
+    parser.add_argument(
+        "-bs",
+        action="store",
+        dest="batch_size",
+        default=MAX_BATCH_SIZE,
+        type=int,
+        help=f"set the maximum number of texts sent in one translation call, default = {MAX_BATCH_SIZE}",
+    )
+    parser.add_argument(
+        "-bc",
+        action="store",
+        dest="batch_chars",
+        default=MAX_BATCH_CHARS,
+        type=int,
+        help=f"set the maximum number of characters sent in one translation call, default = {MAX_BATCH_CHARS}",
+    )
+    parser.add_argument(
+        "-t",
+        action="store",
+        dest="threads",
+        default=DEFAULT_THREADS,
+        type=int,
+        help=f"set the number of translation requests in flight at the same time for each language, default = {DEFAULT_THREADS}",
+    )
+    parser.add_argument(
+        "-max-in-flight",
+        action="store",
+        dest="max_in_flight",
+        default=0,
+        type=int,
+        help="set the number of translation requests in flight at the same time for the whole run, 0 means no limit other than -p times -t, default = 0",
+    )
+    parser.add_argument(
+        "-cps",
+        action="store",
+        dest="chars_per_second",
+        default=0,
+        type=float,
+        help="set the number of characters per second sent to the translation service by the whole run, 0 means no limit, default = 0",
+    )
+    parser.add_argument(
+        "-rps",
+        action="store",
+        dest="requests_per_second",
+        default=0,
+        type=float,
+        help="set the number of requests per second sent to the translation service by the whole run, 0 means no limit, default = 0",
+    )
+    parser.add_argument(
+        "-retries",
+        action="store",
+        dest="max_retries",
+        default=DEFAULT_MAX_RETRIES,
+        type=int,
+        help=f"set the number of retries of a batch failing with a retryable error (e.g. exceeded quota), default = {DEFAULT_MAX_RETRIES}",
+    )
+    parser.add_argument(
+        "-resume",
+        action="store_true",
+        default=False,
+        help="reuse the translations recorded in the journals of an interrupted run instead of sending them again, default = False",
+    )
+    parser.add_argument(
+        "-stream",
+        action="store_true",
+        default=False,
+        help="read, translate and write the strings chunk by chunk so that the memory used doesn't grow with the size of the file, default = False",
+    )
+    parser.add_argument(
+        "-chunk-size",
+        action="store",
+        dest="chunk_size",
+        default=DEFAULT_CHUNK_SIZE,
+        type=int,
+        help=f"set the number of resources read, translated and written at a time with -stream, default = {DEFAULT_CHUNK_SIZE}",
+    )
+    parser.add_argument(
+        "-backend",
+        action="store",
+        default=translation_backend.GoogleApiBackend.name,
+        choices=list(BACKENDS),
+        help=f"set the translation service, {translation_backend.PseudoLocBackend.name} pseudo-localizes the texts locally e.g. for benchmarks, default = {translation_backend.GoogleApiBackend.name}",
+    )
+    parser.add_argument(
+        "-pseudo-latency",
+        action="store",
+        dest="pseudo_latency",
+        default=0,
+        type=float,
+        help="set the seconds each call to the pseudo backend takes, default = 0",
+    )
+    parser.add_argument(
+        "-pseudo-error-rate",
+        action="store",
+        dest="pseudo_error_rate",
+        default=0,
+        type=float,
+        help="set the probability of a call to the pseudo backend failing with a server error, default = 0",
+    )
+    parser.add_argument(
+        "-pseudo-rps",
+        action="store",
+        dest="pseudo_requests_per_second",
+        default=0,
+        type=float,
+        help="set the number of calls per second of each process above which the pseudo backend fails with an exceeded quota, 0 means no limit, default = 0",
+    )
+    parser.add_argument(
+        "-memory",
+        action="store",
+        default="",
+        help=f"specify the path of the translation memory file. Default path will be {translation_memory.MEMORY_FILE_NAME} in the {string_fileutils.STATE_FOLDER_NAME} folder of the output folder",
+    )
+    parser.add_argument(
+        "-no-memory",
+        action="store_true",
+        dest="no_memory",
+        default=False,
+        help="disable the translation memory, default = False",
+    )
+    parser.add_argument(
+        "-memory-max-entries",
+        action="store",
+        dest="memory_max_entries",
+        default=translation_memory.DEFAULT_MAX_ENTRIES,
+        type=int,
+        help=f"set the maximum number of translations kept in the translation memory, default = {translation_memory.DEFAULT_MAX_ENTRIES}",
+    )
+    parser.add_argument(
+        "-memory-max-age",
+        action="store",
+        dest="memory_max_age",
+        default=translation_memory.DEFAULT_MAX_AGE_DAYS,
+        type=int,
+        help=f"set the number of days after which an unused translation is dropped from the translation memory, default = {translation_memory.DEFAULT_MAX_AGE_DAYS}",
+    )
+    parser.add_argument(
+        "-metrics",
+        action="store_true",
+        default=False,
+        help="print the time spent in each phase and the counters of each language at the end of the run, default = False",
+    )
+    parser.add_argument(
+        "-metrics-output",
+        action="store",
+        dest="metrics_output",
+        default="",
+        help="specify the path of a file to write the metrics to, implies -metrics",
+    )
+    parser.add_argument(
+        "-metrics-format",
+        action="store",
+        dest="metrics_format",
+        default="json",
+        choices=["json", "prometheus"],
+        help="set the format of -metrics-output, prometheus is the text format of the node_exporter textfile collector, default = json",
+    )
+    parser.add_argument(
+        "-plan",
+        action="store",
+        nargs="?",
+        const="text",
+        choices=["text", "json"],
+        help="only print, as text or json, the keys, characters, batches and translation memory hits each language would need, nothing is translated or written, default = text",
+    )
+    parser.add_argument(
+        "-log-level",
+        action="store",
+        dest="log_level",
+        default="info",
+        choices=list(logging_utils.LEVELS),
+        help="set the level of the logs, info prints one line per language, debug one line per key, default = info",
+    )
     parser.add_argument(
         "-v",
         action="store_true",
         dest="debug",
         default=False,
-        help="enable the debug logs, default = False",
+        help="enable the debug logs, same as -log-level debug, default = False",
     )
 
     args = parser.parse_args(argv)
-    debug = args.debug
-
-    print("\nScript run started:\n")
-    log("\nDebug logs are enabled. Be prepared to bombarded by the terminal logs\n")
-    print(f"Current script running path = {os.getcwd()}")
-
-    if not os.path.exists(args.i):
-        print(f"Input path({args.i}) doesn't exists so exiting the program\n")
-        parser.print_help(sys.stderr)
-        sys.exit()
-
-    if os.path.isdir(args.i):
-        print(f"Input path({args.i}) is directory so exiting the program\n")
-        parser.print_help(sys.stderr)
-        sys.exit()
-
-    if not args.o.strip():
-        grand_parent_folder = os.path.dirname(os.path.dirname(args.i))
-        args.o = grand_parent_folder
-        log(f"Directory path of provided input file {grand_parent_folder}")
-        make_folder(args.o)
-        print(f"Output folder path not provided! Using output path = {args.o}")
-
-    if args.lang == "":
-        derived_lang = string_fileutils.get_lang_codes_from_values_folders(args.o)
-        if len(derived_lang) == 0:
-            print(
-                f"Couldn't find any lang code to process and none is given in the argument"
+    if args.debug:
+        args.log_level = "debug"
+
+    if args.plan:
+        # the plan is the only output of a dry run so that it can be parsed, the
+        # logs go to stderr
+        with logging_utils.listening(
+            logging_utils.LEVELS[args.log_level], sys.stderr
+        ) as log_queue:
+            plan = run(parser, args, log_queue)
+        if args.plan == "json":
+            print(json.dumps(plan, indent=1))
+        else:
+            print(format_plan(plan))
+    else:
+        with logging_utils.listening(logging_utils.LEVELS[args.log_level]) as log_queue:
+            run(parser, args, log_queue)
+
+
+def get_target_label(args, target, folder_suffix):
+    """Name of a values folder in the logs, the values folders of a project are
+    told apart by their output file."""
+    if args.project:
+        return project_targets.get_out_file_path(
+            target.in_file_path, target.out_folder_path, folder_suffix
+        )
+    return f"values-{folder_suffix}"
+
+
+def run(parser, args, log_queue):
+    logger.debug("Script run started")
+    logger.debug(
+        "Debug logs are enabled. Be prepared to bombarded by the terminal logs"
+    )
+    logger.debug(f"Current script running path = {os.getcwd()}")
+
+    if args.project:
+        found = project_targets.get_project_targets(parser, args, "process")
+    else:
+        found = [project_targets.get_file_target(parser, args)]
+    targets = [
+        Target(in_file_path, out_folder_path, get_lang_pairs(lang))
+        for in_file_path, out_folder_path, lang in found
+    ]
+    logger.debug(f"targets provided for translation = {targets}")
+
+    memory_path = None
+    # pseudo-localized texts are not translations, they are never remembered
+    if not args.no_memory and args.backend != translation_backend.PseudoLocBackend.name:
+        memory_path = args.memory or os.path.join(
+            args.project or args.o,
+            string_fileutils.STATE_FOLDER_NAME,
+            translation_memory.MEMORY_FILE_NAME,
+        )
+
+    if args.plan:
+        return estimate_work(
+            "en",
+            targets,
+            args.f,
+            args.batch_size,
+            args.batch_chars,
+            memory_path,
+        )
+
+    if memory_path:
+        os.makedirs(os.path.dirname(os.path.abspath(memory_path)), exist_ok=True)
+
+    # a language whose input and output didn't change since its last complete run
+    # has nothing to translate, it is skipped without even parsing the input
+    source_hashes = {
+        it.in_file_path: fingerprint.hash_file(it.in_file_path) for it in targets
+    }
+    if not args.f:
+        changed_targets = []
+        for target in targets:
+            changed_pairs = []
+            for pair in target.lang_pairs:
+                if fingerprint.is_up_to_date(
+                    get_fingerprint_path(
+                        target.in_file_path, target.out_folder_path, pair[1]
+                    ),
+                    source_hashes[target.in_file_path],
+                    project_targets.get_out_file_path(
+                        target.in_file_path, target.out_folder_path, pair[1]
+                    ),
+                ):
+                    logger.info(
+                        f"{get_target_label(args, target, pair[1])}: unchanged since the last run, skipped"
+                    )
+                else:
+                    changed_pairs.append(pair)
+            # a language whose values folders are all up to date has nothing to
+            # resume, its journal is left by a run killed after writing them
+            changed_codes = {it[0] for it in changed_pairs}
+            for out_lang_code in dict.fromkeys(it[0] for it in target.lang_pairs):
+                if out_lang_code not in changed_codes:
+                    translation_journal.discard_journal(
+                        get_journal_path(
+                            target.in_file_path, target.out_folder_path, out_lang_code
+                        )
+                    )
+            if changed_pairs:
+                changed_targets.append(target._replace(lang_pairs=changed_pairs))
+        targets = changed_targets
+    tasks = list(iter_target_languages(targets))
+
+    # the journals are left behind only by an interrupted run. The segments of a
+    # language code are journaled with its first input file
+    journal_paths = {}
+    for target, (out_lang_code, _) in tasks:
+        journal_paths.setdefault(
+            out_lang_code,
+            get_journal_path(
+                target.in_file_path, target.out_folder_path, out_lang_code
+            ),
+        )
+    resumed_segments = {}
+    all_journal_paths = {
+        get_journal_path(
+            target.in_file_path, target.out_folder_path, out_lang_code
+        ): out_lang_code
+        for target, (out_lang_code, _) in tasks
+    }
+    for journal_path, out_lang_code in all_journal_paths.items():
+        if not os.path.exists(journal_path):
+            continue
+        if args.resume:
+            journaled = translation_journal.load_journal(journal_path)
+            resumed_segments.setdefault(out_lang_code, {}).update(journaled)
+            logger.info(
+                f"{out_lang_code}: resuming {len(journaled)} segments translated by an interrupted run"
             )
-            parser.print_help(sys.stderr)
-            sys.exit()
         else:
-            args.lang = derived_lang
-            print(f"No lang codes is given so calculated {args.lang} to process")
+            logger.warning(
+                f"[WARNING] {out_lang_code}: found the journal of an interrupted run, use -resume to reuse its translations"
+            )
+
+    if memory_path and tasks:
+        # creating the file once up front so that workers don't race on the schema
+        translation_memory.TranslationMemory(memory_path).close()
+
+    semaphore = None
+    if args.max_in_flight > 0:
+        semaphore = BoundedSemaphore(args.max_in_flight)
+    limiter = None
+    if args.chars_per_second > 0 or args.requests_per_second > 0:
+        limiter = limiter_utils.RateLimiter(
+            args.chars_per_second, args.requests_per_second
+        )
+
+    backend_factory = BACKENDS[args.backend]
+    if args.backend == translation_backend.PseudoLocBackend.name:
+        backend_factory = functools.partial(
+            translation_backend.PseudoLocBackend,
+            args.pseudo_latency,
+            args.pseudo_error_rate,
+            args.pseudo_requests_per_second,
+        )
+
+    if args.metrics or args.metrics_output:
+        metrics.enable()
+    run_start = time.perf_counter()
+
+    all_stats = []
+    plan_stats = []
+    if tasks:
+        # in stream mode every worker reads its input itself, chunk by chunk
+        resource_files = {}
+        if not args.stream:
+            with metrics.timer(metrics.RUN_LANGUAGE, "parse"):
+                for target in targets:
+                    logger.debug(f"Input string file name = {target.in_file_path}\n")
+                    resource_files[target.in_file_path] = resources.parse_resource_file(
+                        target.in_file_path
+                    )
+
+        with Pool(
+            args.pool,
+            initializer=init_worker,
+            initargs=(
+                semaphore,
+                resource_files,
+                limiter,
+                backend_factory,
+                metrics.is_enabled(),
+                log_queue,
+                logging_utils.LEVELS[args.log_level],
+            ),
+        ) as p:
+            # the languages are planned first so that a segment needed by several
+            # keys, values folders or modules of the same language is translated once
+            known_segments = resumed_segments
+            # estimated work of each language, unknown in stream mode
+            language_costs = [0] * len(tasks)
+            if not args.stream:
+                planned = p.starmap(
+                    plan_language,
+                    map(
+                        lambda it: (
+                            "en",
+                            it[1],
+                            it[0].in_file_path,
+                            it[0].out_folder_path,
+                            args.f,
+                        ),
+                        tasks,
+                    ),
+                )
+                segments_per_code = {}
+                for (_, (out_lang_code, _)), (_, segments, language_metrics) in zip(
+                    tasks, planned
+                ):
+                    segments_per_code.setdefault(out_lang_code, {}).update(
+                        dict.fromkeys(segments)
+                    )
+                    metrics.merge(language_metrics)
+                logger.info(
+                    f"Planned {sum(map(len, segments_per_code.values()))} unique segments to translate instead of {sum(len(it[1]) for it in planned)}"
+                )
+                segments_per_code = {
+                    code: [
+                        segment
+                        for segment in segments
+                        if segment not in known_segments.get(code, {})
+                    ]
+                    for code, segments in segments_per_code.items()
+                }
+                language_costs = [keys for keys, _, _ in planned]
+                # the segments of a language are split into chunks of as many
+                # batches as a worker sends at the same time, so that a language
+                # with much more work than the others is spread over the pool
+                chunks = [
+                    (out_lang_code, chunk)
+                    for out_lang_code, segments in segments_per_code.items()
+                    for chunk in make_batches(
+                        segments,
+                        args.batch_size * max(args.threads, 1),
+                        args.batch_chars * max(args.threads, 1),
+                    )
+                ]
+                logger.debug(
+                    f"Translating the segments in {len(chunks)} chunks of work"
+                )
+                results = scheduler.run_by_cost(
+                    p,
+                    translate_segments,
+                    [
+                        (
+                            "en",
+                            out_lang_code,
+                            chunk,
+                            args.batch_size,
+                            args.batch_chars,
+                            memory_path,
+                            args.threads,
+                            args.max_retries,
+                            journal_paths[out_lang_code],
+                        )
+                        for out_lang_code, chunk in chunks
+                    ],
+                    [sum(map(len, chunk)) for _, chunk in chunks],
+                )
+                for (out_lang_code, _), (translated, stats) in zip(chunks, results):
+                    known_segments.setdefault(out_lang_code, {}).update(translated)
+                    plan_stats.append(stats)
+                    metrics.merge(stats["metrics"])
+
+            all_stats = scheduler.run_by_cost(
+                p,
+                make_other_lang_string_file,
+                [
+                    (
+                        "en",
+                        pair,
+                        target.in_file_path,
+                        target.out_folder_path,
+                        args.f,
+                        args.batch_size,
+                        args.batch_chars,
+                        memory_path,
+                        args.threads,
+                        None,
+                        args.max_retries,
+                        args.stream,
+                        args.chunk_size,
+                        known_segments.get(pair[0]),
+                        source_hashes[target.in_file_path],
+                    )
+                    for target, pair in tasks
+                ],
+                language_costs,
+            )
+            for stats in all_stats:
+                metrics.merge(stats["metrics"])
+
+        # every output file is written, the translations of the journals are
+        # either in them or failed
+        for journal_path in all_journal_paths:
+            translation_journal.discard_journal(journal_path)
+
+    failed_count = 0
+    for (target, (_, folder_suffix)), stats in zip(tasks, all_stats):
+        if stats["failed"]:
+            failed_count = failed_count + len(stats["failed"])
+            logger.error(
+                f"[ERROR] {get_target_label(args, target, folder_suffix)}: {len(stats['failed'])} values failed to be translated, keys = {', '.join(dict.fromkeys(stats['failed']))}"
+            )
+    if failed_count:
+        logger.error(
+            f"[ERROR] {failed_count} values failed to be translated, rerun the script to retry only these"
+        )
 
-    with Pool(args.pool) as p:
-        array_lang = str(args.lang).split(",")
-        array_lang_folder_prefix_pair = list(
-            map(lambda it: (it.strip().split("-")[0], it.strip()), array_lang)
+    if memory_path and tasks:
+        memory = translation_memory.TranslationMemory(
+            memory_path, args.memory_max_entries, args.memory_max_age
         )
-        log(f"languages provided for translation = {array_lang_folder_prefix_pair}")
-        arg_map = map(
-            lambda it: ("en", it, args.i, args.o, args.f, debug),
-            array_lang_folder_prefix_pair,
+        evicted = memory.evict()
+        memory.close()
+        logger.info(
+            f"Translation memory: hits = {sum(it['memory_hits'] for it in all_stats + plan_stats)}, misses = {sum(it['memory_misses'] for it in all_stats + plan_stats)}, evicted = {evicted}"
         )
-        p.starmap(make_other_lang_string_file, arg_map)
+
+    if metrics.is_enabled():
+        metrics.add_time(metrics.RUN_LANGUAGE, "total", time.perf_counter() - run_start)
+        logger.info(f"\n{metrics.format_summary()}")
+        if args.metrics_output:
+            metrics.write_report(args.metrics_output, args.metrics_format, "gtranslate")
+            logger.info(f"Metrics report written to {args.metrics_output}")
 
 
 if __name__ == "__main__":
     main(sys.argv[1:])
-    print("\nOn your right cap!")
+    print("\nOn your right cap!", file=sys.stderr)
@@ -5,24 +5,26 @@
 
 
 from multiprocessing import Pool
+from collections import Counter
 import argparse
-import re
+import logging
 import sys
-from lxml import etree as ET
 import os
-from xml.sax.saxutils import escape
+import time
 import core.fileutils as string_fileutils
+import core.targets as project_targets
+import core.resource_index as resource_index
+import core.resources as resources
+import core.validation_rules as validation_rules
+import core.metrics as metrics
+import core.validation_cache as validation_cache
+import core.logging_utils as logging_utils
+import core.scheduler as scheduler
+import core.reporters as reporters
 
-format_regex = re.compile(
-    r"(?:%(?:\d+\$)?s|%(?:\d+\$)?d)"
-)  # Making non capturing groups so that findall returns actual result instead of tuple of gropus
-
-debug = False
-
-
-def log(msg):
-    if debug:
-        print(msg)
+logger = logging.getLogger("validate")
+# Input files parsed once by the parent process by path, see init_worker
+shared_resource_files = {}
 
 
 # This subroutine extracts the string including html tags
@@ -37,103 +39,57 @@ def log(msg):
 # import libraries
 
 
-def isTranslatable(node):
-    return node.get("translatable") != "false"
-
-
-def get_previous_string(root, out_lang_code, id):
+def get_previous_string(index, out_lang_code, id):
     if type(id) is not str:
         raise ValueError
-    if root is None:
-        raise ValueError("Root is None")
-    answer_list = root.findall(f".//string[@name='{id}']")
-    if len(answer_list) == 0:
+    if index is None:
+        raise ValueError("Index is None")
+    if ("string", id) not in index:
         raise ValueError(f"Couldn't find string with {id} for values-{out_lang_code}")
     else:
-        return answer_list[0].text
+        return index[("string", id)]
 
 
-def get_previous_string_item(tag, root, id, index):
+def get_previous_string_item(tag, index, id, item_key):
     if type(id) is not str:
         raise ValueError
-    if root is None:
+    if index is None:
         return None
-    answer_list = root.findall(f".//{tag}[@name='{id}']")
-    if len(answer_list) == 0 or len(answer_list[0]) < index + 1:
+    previous_items = index.get((tag, id))
+    if previous_items is None:
         return None
     else:
-        return answer_list[0][index].text
+        return previous_items.get(item_key)
 
 
-def match(
-    translated_format_identifier,
-    english_format_identifier,
-    name,
-    lang,
-    translated_text,
-    original_text,
+def init_worker(
+    resource_files, metrics_enabled=False, log_queue=None, log_level=logging.INFO
 ):
-    if not original_text:
-        return (name, lang, "English string is empty")
-    if not translated_text:
-        # Case when translated string is empty
-        return (name, lang, "String is empty")
-    if len(translated_format_identifier) != 0 or len(english_format_identifier) != 0:
-        log(
-            f"trans_list = {translated_format_identifier} and eng = {english_format_identifier} for name = {name} and lang = {lang}\n"
-        )
-        for match in english_format_identifier:
-            if match not in translated_format_identifier:
-                return (
-                    name,
-                    lang,
-                    original_text,
-                    translated_text,
-                    english_format_identifier,
-                )
-
-
-def contains_warning_char(name, lang, translated_text, original_text):
-    if not translated_text:
-        # Empty string should not come here
-        raise ValueError(
-            f"String is empty for name = {name} and text = {original_text}"
-        )
-        #'-' in translated_text or
-    if "&" in translated_text:
-        return (name, lang, "Warning characters &", original_text, translated_text)
-
-    if "..." in translated_text:
-        return (name, lang, "Warning characters ...", original_text, translated_text)
-
-    regexp = re.compile(r"\d-\d")
-    if regexp.search(translated_text):
-        return (name, lang, "Warning characters -", original_text, translated_text)
-
-    if "--" in translated_text:
-        return (name, lang, "Warning characters --", original_text, translated_text)
-
-
-def check_xml_escaping(name, lang, translated_text, original_text):
-    if not translated_text:
-        # Empty string should not come here
-        raise ValueError(
-            f"String is empty for name = {name} and text = {original_text}"
-        )
-    if escape(translated_text) != translated_text:
-        return (
-            name,
-            lang,
-            "Wrong xml escaping",
-            original_text,
-            translated_text,
-            f"Escaped string: {escape(translated_text)}",
-        )
-
+    """Pool initializer which shares the inputs parsed once by the parent process,
+    enables the metrics of the worker and sends its logs to the parent process."""
+    global shared_resource_files
+    if log_queue is not None:
+        logging_utils.init_worker_logging(log_queue, log_level)
+    shared_resource_files = resource_files or {}
+    if metrics_enabled:
+        metrics.enable()
+
+
+@logging_utils.flush_after
+def validate_files(
+    in_lang,
+    out_lang,
+    in_file_path,
+    out_folder_path,
+    disabled_rules=(),
+    cache_path=None,
+    resource_file=None,
+):
+    """Returns the findings of the enabled rules for values-out_lang, the number
+    of findings of each rule and the metrics of the validation.
 
-def validate_files(in_lang, out_lang, in_file_path, out_folder_path, debug_local):
-    global debug
-    debug = debug_local
+    The findings of a pair of texts found in the cache at cache_path are replayed
+    instead of running the rules again."""
     # create outfile name by appending the language code to the input file name
     # print('in_lang = {0}, out_lang = {1}, in_file_path = {2} and out_folder_path = {3}'.format(in_lang, out_lang, in_file_path, out_folder_path))
     _, tail = os.path.split(in_file_path)
@@ -142,142 +98,122 @@ def validate_files(in_lang, out_lang, in_file_path, out_folder_path, debug_local
     if not os.path.exists(out_file_path):
         raise FileNotFoundError(f"File with path = {out_file_path} doesn't exist")
 
-    # read xml structure
-    log(f"File name = {in_file_path}")
-    input_tree = ET.parse(in_file_path)
-    input_tree_root = input_tree.getroot()
+    # read xml structure, the parent process shares the already parsed input
+    if resource_file is None:
+        resource_file = shared_resource_files.get(in_file_path)
+    if resource_file is None:
+        logger.debug(f"File name = {in_file_path}")
+        with metrics.timer(out_lang, "parse"):
+            resource_file = resources.parse_resource_file(in_file_path)
 
     # trying to read output xml if that exists
     try:
-        output_tree = ET.parse(out_file_path)
-        output_tree_root = output_tree.getroot()
+        with metrics.timer(out_lang, "lookup"):
+            output_index = resource_index.build_resource_index_from_file(out_file_path)
     except FileNotFoundError:
         raise FileNotFoundError(f"File with path = {out_file_path} doesn't exist")
 
-    # cycle through elements
-    ans = []
-    for i in range(len(input_tree_root)):
-        # for each translatable string call the translation subroutine
-        # and replace the string by its translation,
-        # descend into each string array
-
-        input_node = input_tree_root[i]
+    rules = validation_rules.get_enabled_rules(disabled_rules)
+    counters = Counter()
+    validate_start = time.perf_counter()
 
+    # cycle through elements, collecting (name, translated text, english text)
+    checks = []
+    for entry in resource_file.entries:
         # If comment then continue
-        if not isinstance(input_node.tag, str):
+        if entry.tag == resources.COMMENT_TAG:
             continue
 
-        name_attr = input_node.attrib["name"]
-        # Translating the string tag
-        if input_node.tag == "string":
-            if not input_node.text:
-                ans.append(
-                    match(
-                        translated_matches,
-                        english_matches,
-                        name_attr,
-                        out_lang,
-                        previous_translated_text,
-                        input_node.text,
-                    )
-                )
+        name_attr = entry.name
+        # Validating the string tag
+        if entry.tag == "string":
+            if not entry.text:
+                checks.append((name_attr, None, entry.text))
                 continue
-            if (not input_node.text.startswith("@string/")) and isTranslatable(
-                input_node
+            if (not entry.text.startswith("@string/")) and resources.is_translatable(
+                entry.attrib
             ):
                 previous_translated_text = get_previous_string(
-                    output_tree_root, out_lang, name_attr,
+                    output_index,
+                    out_lang,
+                    name_attr,
                 )
 
-                log(
-                    f'Validating string with name = {name_attr}, prev string = "{previous_translated_text}" against en  string "{input_node.text}"'
+                logger.debug(
+                    f'Validating string with name = {name_attr}, prev string = "{previous_translated_text}" against en  string "{entry.text}"'
                 )
-                if previous_translated_text:
-                    # Empty string throws exception
-                    translated_matches = re.findall(
-                        format_regex, previous_translated_text
-                    )
-                else:
-                    translated_matches = []
-                english_matches = re.findall(format_regex, input_node.text)
-                ans.append(
-                    match(
-                        translated_matches,
-                        english_matches,
-                        name_attr,
-                        out_lang,
-                        previous_translated_text,
-                        input_node.text,
-                    )
-                )
-                ans.append(
-                    contains_warning_char(
-                        name_attr, out_lang, previous_translated_text, input_node.text
-                    )
+                checks.append((name_attr, previous_translated_text, entry.text))
+
+        # Validating the string-array tag
+        if resources.is_item_container(entry.tag):
+            for item in entry.items:
+                if item.text.startswith("@string/") or not resources.is_translatable(
+                    item.attrib
+                ):
+                    continue
+                previous_string = get_previous_string_item(
+                    entry.tag, output_index, name_attr, item.key
                 )
-                ans.append(
-                    check_xml_escaping(
-                        name_attr, out_lang, previous_translated_text, input_node.text
-                    )
-                )
-
-        # Translating the string-array tag
-        if input_node.tag == "string-array" or input_node.tag == "plurals":
-
-            for j in range(len(input_node)):
-                # for each translatable string call the translation subroutine
-                # and replace the string by its translation,
 
-                if input_node[j].tag == "item":
-                    if not input_node[j].text.startswith("@string/") and isTranslatable(
-                        input_node[j]
-                    ):
-                        previous_string = get_previous_string_item(
-                            input_node.tag, output_tree_root, name_attr, j
-                        )
-
-                        log(
-                            f'Validating {input_node.tag} with name = {name_attr}, prev string = "{previous_string}" against en  string "{input_node[j].text}"'
-                        )
-
-                        translated_matches = re.findall(format_regex, previous_string)
-                        english_matches = re.findall(format_regex, input_node[j].text)
-                        ans.append(
-                            match(
-                                translated_matches,
-                                english_matches,
-                                name_attr,
-                                out_lang,
-                                previous_string,
-                                input_node[j].text,
-                            )
-                        )
-                        ans.append(
-                            contains_warning_char(
-                                name_attr,
-                                out_lang,
-                                previous_translated_text,
-                                input_node.text,
-                            )
-                        )
-                        ans.append(
-                            check_xml_escaping(
-                                name_attr,
-                                out_lang,
-                                previous_translated_text,
-                                input_node.text,
-                            )
-                        )
-                else:
-                    raise ValueError
-    return ans
+                logger.debug(
+                    f'Validating {entry.tag} with name = {name_attr}, prev string = "{previous_string}" against en  string "{item.text}"'
+                )
+                checks.append((name_attr, previous_string, item.text))
 
+    rule_names = [it.name for it in rules]
+    keys = [
+        validation_cache.make_key(
+            validation_rules.RULESET_VERSION, rule_names, original_text, translated_text
+        )
+        for _, translated_text, original_text in checks
+    ]
+    cache = None
+    found = {}
+    if cache_path:
+        cache = validation_cache.ValidationCache(cache_path)
+        found = cache.lookup(keys)
+        if cache.hits:
+            metrics.count(out_lang, "cache_hits", cache.hits)
+    cached = dict(found)
 
-flatten = lambda l: [item for sublist in l for item in sublist]
+    ans = []
+    new_findings = {}
+    for (name_attr, translated_text, original_text), key in zip(checks, keys):
+        if key in cached:
+            findings = [
+                validation_rules.Finding(
+                    name_attr,
+                    out_lang,
+                    rule_name,
+                    message,
+                    original_text,
+                    translated_text,
+                    details,
+                )
+                for rule_name, message, details in cached[key]
+            ]
+        else:
+            findings = validation_rules.run_rules(
+                name_attr, out_lang, translated_text, original_text, rules
+            )
+            # only the parts depending on the texts are kept so that the findings
+            # are replayed for any key and language with the same texts
+            cached[key] = [[it.rule, it.message, it.details] for it in findings]
+            new_findings[key] = cached[key]
+        for finding in findings:
+            counters[finding.rule] += 1
+            ans.append(finding)
+    if cache is not None:
+        cache.store(new_findings)
+        cache.close()
+    metrics.add_time(out_lang, "validate", time.perf_counter() - validate_start)
+    logger.info(
+        f"values-{out_lang}: {len(ans)} findings in {out_file_path}, {sum(key in found for key in keys)} of {len(checks)} texts checked by an earlier run"
+    )
+    return ans, counters, metrics.collect()
 
 
 def main(argv):
-    global debug
     parser = argparse.ArgumentParser(
         description="This is a python module to verify the same number of positional arguments, missing translation, warning characters(e.g., &, ..., -, --) and wrong xml escaping"
     )
@@ -287,9 +223,15 @@ def main(argv):
         default="",
         help="specify the absolute path of the output folder. Default absolute path will be parent folder of the folder containing the strings.xml file",
     )
-    parser.add_argument(
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument(
         "-i", action="store", help="specify the absolute input file path"
     )
+    input_group.add_argument(
+        "-project",
+        action="store",
+        help="specify the absolute path of a project to validate the translations of the string resource files of all its modules in one run, the lang codes default to the values folders of each module",
+    )
     parser.add_argument(
         "-lang",
         action="store",
@@ -304,57 +246,224 @@ def main(argv):
         type=int,
         help="set the number of process pool to use, default = 5",
     )
+    parser.add_argument(
+        "-disable-rules",
+        action="store",
+        dest="disable_rules",
+        default="",
+        help=f"specify the comma-separated rules to skip, available rules are {', '.join(validation_rules.RULES)}",
+    )
+    parser.add_argument(
+        "-report",
+        action="store",
+        default="text",
+        choices=list(reporters.REPORTERS),
+        help="set the format of the findings, jsonl is a json object per finding, sarif and junit are read by most CI systems, default = text",
+    )
+    parser.add_argument(
+        "-report-output",
+        action="store",
+        dest="report_output",
+        default="",
+        help="specify the path of the file to write the findings to, default = print them",
+    )
+    parser.add_argument(
+        "-cache",
+        action="store",
+        default="",
+        help=f"specify the path of the file caching the findings of each pair of texts. Default path will be {validation_cache.CACHE_FILE_NAME} in the {string_fileutils.STATE_FOLDER_NAME} folder of the output folder",
+    )
+    parser.add_argument(
+        "-no-cache",
+        action="store_true",
+        dest="no_cache",
+        default=False,
+        help="disable the cache of the findings and run every rule on every text, default = False",
+    )
+    parser.add_argument(
+        "-metrics",
+        action="store_true",
+        default=False,
+        help="print the time spent in each phase and rule for each language at the end of the run, default = False",
+    )
+    parser.add_argument(
+        "-metrics-output",
+        action="store",
+        dest="metrics_output",
+        default="",
+        help="specify the path of a file to write the metrics to, implies -metrics",
+    )
+    parser.add_argument(
+        "-metrics-format",
+        action="store",
+        dest="metrics_format",
+        default="json",
+        choices=["json", "prometheus"],
+        help="set the format of -metrics-output, prometheus is the text format of the node_exporter textfile collector, default = json",
+    )
+    parser.add_argument(
+        "-log-level",
+        action="store",
+        dest="log_level",
+        default="info",
+        choices=list(logging_utils.LEVELS),
+        help="set the level of the logs, info prints one line per language, debug one line per key, default = info",
+    )
     parser.add_argument(
         "-v",
         action="store_true",
         dest="debug",
         default=False,
-        help="enable the debug logs",
+        help="enable the debug logs, same as -log-level debug, default = False",
     )
 
     args = parser.parse_args(argv)
-    debug = args.debug
-    log("Debug logs are enabled. Be prepared to bombarded by the terminal logs")
+    if args.debug:
+        args.log_level = "debug"
 
-    if not os.path.exists(args.i):
-        print(f"Input path({args.i}) doesn't exists so exiting the program\n")
-        parser.print_help(sys.stderr)
-        sys.exit()
+    # the report is written to stdout while the languages are validated, the logs
+    # go to stderr so that they are never mixed with it
+    with logging_utils.listening(
+        logging_utils.LEVELS[args.log_level], sys.stderr
+    ) as log_queue:
+        run(parser, args, log_queue)
+
+
+def run(parser, args, log_queue):
+    logger.debug(
+        "Debug logs are enabled. Be prepared to bombarded by the terminal logs"
+    )
 
-    if os.path.isdir(args.i):
-        print(f"Input path({args.i}) is directory so exiting the program\n")
+    if args.project:
+        targets = project_targets.get_project_targets(
+            parser, args, "validate", existing_only=True
+        )
+    else:
+        targets = [project_targets.get_file_target(parser, args)]
+    # a task per translated file, (input file path, output folder path, lang code)
+    tasks = [
+        (in_file_path, out_folder_path, it.strip())
+        for in_file_path, out_folder_path, lang in targets
+        for it in lang.split(",")
+    ]
+    logger.debug(f"translated files provided for validation = {tasks}")
+
+    disabled_rules = tuple(filter(None, map(str.strip, args.disable_rules.split(","))))
+    try:
+        rules = validation_rules.get_enabled_rules(disabled_rules)
+    except ValueError as e:
+        logger.error(f"{e}\n")
         parser.print_help(sys.stderr)
         sys.exit()
 
-    if not args.o.strip():
-        grand_parent_folder = os.path.dirname(os.path.dirname(args.i))
-        args.o = grand_parent_folder
-        log(f"Directory path of provided input file {grand_parent_folder}")
-        print(f"Output folder path not provided! Using output path = {args.o}")
-
-    if args.lang == "":
-        derived_lang = string_fileutils.get_lang_codes_from_values_folders(args.o)
-        if len(derived_lang) == 0:
-            print(
-                f"Couldn't find any lang code to process and none is given in the argument"
+    cache_path = None
+    if not args.no_cache:
+        cache_path = args.cache or os.path.join(
+            args.project or args.o,
+            string_fileutils.STATE_FOLDER_NAME,
+            validation_cache.CACHE_FILE_NAME,
+        )
+        # creating the file once up front so that workers don't race on the schema
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        validation_cache.ValidationCache(cache_path).close()
+
+    if args.metrics or args.metrics_output:
+        metrics.enable()
+    run_start = time.perf_counter()
+
+    with metrics.timer(metrics.RUN_LANGUAGE, "parse"):
+        resource_files = {
+            in_file_path: resources.parse_resource_file(in_file_path)
+            for in_file_path in dict.fromkeys(it[0] for it in tasks)
+        }
+
+    with Pool(
+        args.pool,
+        initializer=init_worker,
+        initargs=(
+            resource_files,
+            metrics.is_enabled(),
+            log_queue,
+            logging_utils.LEVELS[args.log_level],
+        ),
+    ) as p:
+        # the size of a translated file stands for the work of its language, the
+        # largest ones are started first
+        costs = []
+        for in_file_path, out_folder_path, lang in tasks:
+            try:
+                costs.append(
+                    os.path.getsize(
+                        project_targets.get_out_file_path(
+                            in_file_path, out_folder_path, lang
+                        )
+                    )
+                )
+            except OSError:
+                costs.append(0)
+        report_file = sys.stdout
+        if args.report_output:
+            report_file = open(args.report_output, "w", encoding="utf-8")
+        try:
+            reporter = reporters.REPORTERS[args.report](
+                report_file, rules, args.project or os.getcwd()
             )
-            parser.print_help(sys.stderr)
-            sys.exit()
-        else:
-            args.lang = derived_lang
-            print(f"No lang codes is given so calculated {args.lang} to process")
-
-    with Pool(args.pool) as p:
-        array_lang = str(args.lang).split(",")
-        array_lang_striped = list(map(lambda it: it.strip(), array_lang))
-        log(f"languages provided for translation = {array_lang_striped}")
-        arg_map = map(lambda it: ("en", it, args.i, args.o, debug), array_lang_striped)
-        answers = p.starmap(validate_files, arg_map)
-        flatten_ans = flatten(answers)
-        filtered = filter(lambda it: it is not None, flatten_ans)
-        print(*list(filtered), sep="\n\n")
+            reporter.start()
+            counters = Counter()
+            # the languages finish in an order which changes from run to run, the
+            # findings of a language are kept until the ones before it in task
+            # order are written, so the report is the same on every run
+            done = {}
+            next_index = 0
+            for index, result in scheduler.iter_by_cost(
+                p,
+                validate_files,
+                [
+                    (
+                        "en",
+                        lang,
+                        in_file_path,
+                        out_folder_path,
+                        disabled_rules,
+                        cache_path,
+                    )
+                    for in_file_path, out_folder_path, lang in tasks
+                ],
+                costs,
+            ):
+                done[index] = result
+                while next_index in done:
+                    findings, language_counters, language_metrics = done.pop(next_index)
+                    reporter.report(
+                        tasks[next_index][2],
+                        project_targets.get_out_file_path(*tasks[next_index]),
+                        findings,
+                    )
+                    counters.update(language_counters)
+                    metrics.merge(language_metrics)
+                    next_index = next_index + 1
+            reporter.finish(counters)
+        finally:
+            if report_file is not sys.stdout:
+                report_file.close()
+
+    if cache_path:
+        cache = validation_cache.ValidationCache(cache_path)
+        evicted = cache.evict()
+        cache.close()
+        logger.debug(f"Validation cache: evicted = {evicted}")
+
+    if args.report_output:
+        logger.info(f"Report written to {args.report_output}")
+
+    if metrics.is_enabled():
+        metrics.add_time(metrics.RUN_LANGUAGE, "total", time.perf_counter() - run_start)
+        logger.info(f"\n{metrics.format_summary()}")
+        if args.metrics_output:
+            metrics.write_report(args.metrics_output, args.metrics_format, "validate")
+            logger.info(f"Metrics report written to {args.metrics_output}")
 
 
 if __name__ == "__main__":
     main(sys.argv[1:])
-    print("\nOn your right cap!")
+    print("\nOn your right cap!", file=sys.stderr)
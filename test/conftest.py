@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the scripts import their helpers as core.x, as when they are run from scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts"))
@@ -0,0 +1,62 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import core.journal as journal
+import gtranslate
+
+TEST_FOLDER = os.path.dirname(os.path.abspath(__file__))
+GTRANSLATE = os.path.join(os.path.dirname(TEST_FOLDER), "scripts", "gtranslate.py")
+
+
+def run_gtranslate(in_file_path, out_folder_path):
+    subprocess.run(
+        [
+            sys.executable,
+            GTRANSLATE,
+            "-i",
+            in_file_path,
+            "-o",
+            out_folder_path,
+            "-lang",
+            "de",
+            "-backend",
+            "pseudo",
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+
+def test_journal_round_trip_ignores_a_cut_line(tmp_path):
+    path = str(tmp_path / "journal" / "strings.xml.de.journal.jsonl")
+    translation_journal = journal.Journal(path)
+    translation_journal.record({"Hello": "Hallo", "World": "Welt"})
+    translation_journal.record({})
+    translation_journal.close()
+    # a run killed while writing leaves a partial last line
+    with open(path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"source": "Bye", "te')
+
+    assert journal.load_journal(path) == {"Hello": "Hallo", "World": "Welt"}
+    journal.discard_journal(path)
+    journal.discard_journal(path)
+    assert journal.load_journal(path) == {}
+
+
+def test_journal_of_an_unchanged_language_is_discarded(tmp_path):
+    out_folder_path = str(tmp_path / "res")
+    in_file_path = os.path.join(out_folder_path, "values", "strings.xml")
+    os.makedirs(os.path.dirname(in_file_path))
+    shutil.copy(os.path.join(TEST_FOLDER, "teststrings.xml"), in_file_path)
+    run_gtranslate(in_file_path, out_folder_path)
+
+    # left by a run killed after writing values-de
+    journal_path = gtranslate.get_journal_path(in_file_path, out_folder_path, "de")
+    stale_journal = journal.Journal(journal_path)
+    stale_journal.record({"Hello": "Stale"})
+    stale_journal.close()
+
+    run_gtranslate(in_file_path, out_folder_path)
+    assert not os.path.exists(journal_path)
@@ -0,0 +1,55 @@
+import collections
+import sys
+import threading
+
+import core.metrics as metrics
+
+
+def test_registry_keeps_every_update_of_concurrent_threads():
+    registry = metrics.Registry()
+    switch_interval = sys.getswitchinterval()
+    # switching threads as often as possible makes lost updates likely
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(
+                target=lambda: [
+                    (
+                        registry.count("de", "requests", 1),
+                        registry.observe("de", "latency", 0.01),
+                        registry.add_time("de", "translate", 0.01),
+                    )
+                    for _ in range(20000)
+                ]
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert registry.counters[("de", "requests")] == 8 * 20000
+    assert registry.histograms[("de", "latency")][1] == 8 * 20000
+    assert registry.timers[("de", "translate")][0] == 8 * 20000
+
+
+def test_prometheus_report_has_one_type_line_per_metric():
+    metrics.enable()
+    try:
+        for language in ("de", "fr"):
+            metrics.add_time(language, "translate", 0.2)
+            metrics.count(language, "requests")
+            metrics.observe(language, "request_seconds", 0.2)
+        report = metrics.to_prometheus("gtranslate")
+    finally:
+        metrics.registry = None
+
+    type_lines = [it for it in report.splitlines() if it.startswith("# TYPE")]
+    assert collections.Counter(type_lines).most_common(1)[0][1] == 1
+    assert "# TYPE gtranslate_request_seconds histogram" in type_lines
+    # the samples of a histogram follow its TYPE line
+    samples = report.split("# TYPE gtranslate_request_seconds histogram\n")[1]
+    assert samples.count('_count{language="') == 2
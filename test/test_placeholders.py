@@ -0,0 +1,38 @@
+import core.placeholders as placeholders
+
+TEXT = "Hi <b>%1$s</b>, you have %2$d new &amp; @string/app_name messages, 100% sure"
+
+
+def test_protect_and_restore_round_trip():
+    protected = placeholders.protect(TEXT)
+    assert protected.placeholders == [
+        "<b>",
+        "%1$s",
+        "</b>",
+        "%2$d",
+        "&amp;",
+        "@string/app_name",
+    ]
+    assert protected.text.endswith("messages, 100% sure")
+    assert placeholders.restore(protected, protected.text) == TEXT
+
+
+def test_percent_before_a_word_is_not_a_placeholder():
+    protected = placeholders.protect("50%off, 10%extra and 5%big for %1$s's %d%%")
+    assert protected.placeholders == ["%1$s", "%d", "%%"]
+
+
+def test_restore_accepts_tokens_moved_and_spaced_by_the_service():
+    protected = placeholders.protect("%1$s and %2$s")
+    assert placeholders.restore(protected, "__PH_1__ und __ PH_0 __") == "%2$s und %1$s"
+
+
+def test_restore_rejects_missing_or_repeated_tokens():
+    protected = placeholders.protect("%1$s and %2$s")
+    assert placeholders.restore(protected, "__PH_0__ und") is None
+    assert placeholders.restore(protected, "__PH_0__ __PH_0__ __PH_1__") is None
+
+
+def test_has_text():
+    assert not placeholders.has_text(placeholders.protect("%1$s <b></b>"))
+    assert placeholders.has_text(placeholders.protect("%1$s files"))
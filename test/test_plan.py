@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+TEST_FOLDER = os.path.dirname(os.path.abspath(__file__))
+GTRANSLATE = os.path.join(os.path.dirname(TEST_FOLDER), "scripts", "gtranslate.py")
+
+
+def test_json_plan_is_the_only_output_on_stdout(tmp_path):
+    completed = subprocess.run(
+        [
+            sys.executable,
+            GTRANSLATE,
+            "-i",
+            os.path.join(TEST_FOLDER, "teststrings.xml"),
+            "-o",
+            str(tmp_path),
+            "-lang",
+            "de,fr",
+            "-backend",
+            "pseudo",
+            "-plan",
+            "json",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    plan = json.loads(completed.stdout)
+    assert [it["values_folder"] for it in plan["languages"]] == [
+        "values-de",
+        "values-fr",
+    ]
+    assert plan["total"]["keys"] > 0
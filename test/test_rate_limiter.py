@@ -0,0 +1,28 @@
+import core.rate_limiter as rate_limiter
+import core.translation_backend as translation_backend
+
+
+class ApiError(Exception):
+    """Error shaped like the ones of google-api-core."""
+
+    def __init__(self, message, code, errors=()):
+        super().__init__(message)
+        self.code = code
+        self.errors = list(errors)
+
+
+def test_only_rate_limit_403_errors_are_quota_errors():
+    assert rate_limiter.is_quota_error(translation_backend.BackendError("x", 429))
+    assert rate_limiter.is_quota_error(
+        ApiError("403 Forbidden", 403, [{"reason": "userRateLimitExceeded"}])
+    )
+    assert rate_limiter.is_quota_error(ApiError("403 User Rate Limit Exceeded", 403))
+    assert not rate_limiter.is_quota_error(
+        ApiError("403 Cloud Translation API is not integrated", 403)
+    )
+    assert not rate_limiter.is_quota_error(
+        ApiError("403 Rate limit exceeded?", 403, [{"reason": "accessNotConfigured"}])
+    )
+    assert not rate_limiter.is_retryable_error(
+        ApiError("403 The caller does not have permission to operate", 403)
+    )
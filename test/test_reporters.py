@@ -0,0 +1,43 @@
+import io
+import json
+import os
+
+import core.reporters as reporters
+import core.validation_rules as validation_rules
+
+TRANSLATED = """<?xml version="1.0" encoding="utf-8"?>
+<resources>
+    <string name="ok">Gut</string>
+    <string name="dots">Warte...</string>
+</resources>
+"""
+
+
+def test_sarif_result_points_to_the_line_of_the_string(tmp_path):
+    path = os.path.join(str(tmp_path), "app", "res", "values-de", "strings.xml")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as translated_file:
+        translated_file.write(TRANSLATED)
+    finding = validation_rules.Finding(
+        "dots", "de", "ellipsis", "Use …", "Wait…", "Warte...", None
+    )
+
+    output = io.StringIO()
+    reporter = reporters.SarifReporter(
+        output, list(validation_rules.RULES.values()), str(tmp_path)
+    )
+    reporter.start()
+    reporter.report("de", path, [finding])
+    reporter.finish({})
+
+    run = json.loads(output.getvalue())["runs"][0]
+    root_uri = run["originalUriBaseIds"][reporters.SARIF_ROOT_ID]["uri"]
+    assert root_uri.startswith("file://") and root_uri.endswith("/")
+    location = run["results"][0]["locations"][0]["physicalLocation"]
+    assert location == {
+        "artifactLocation": {
+            "uri": "app/res/values-de/strings.xml",
+            "uriBaseId": reporters.SARIF_ROOT_ID,
+        },
+        "region": {"startLine": 4},
+    }
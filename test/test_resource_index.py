@@ -0,0 +1,125 @@
+import os
+import pickle
+import re
+
+from lxml import etree as ET
+import pytest
+
+import core.resource_index as resource_index
+import core.translation_backend as translation_backend
+import gtranslate
+
+XLIFF = "urn:oasis:names:tc:xliff:document:1.2"
+STRINGS = f"""<?xml version="1.0" encoding="utf-8"?>
+<resources xmlns:xliff="{XLIFF}">
+    <string name="greeting">Hello <xliff:g id="user">%1$s</xliff:g>, welcome back</string>
+    <string name="copy"><b>Bold</b> and <xliff:g id="app">Andy</xliff:g> stay</string>
+    <plurals name="songs">
+        <item quantity="one"><xliff:g id="count">%d</xliff:g> song left</item>
+        <item quantity="other"><xliff:g id="count">%d</xliff:g> songs left</item>
+    </plurals>
+    <string name="pair"><xliff:g id="first">%1$s</xliff:g> before <xliff:g id="second">%2$s</xliff:g></string>
+</resources>
+"""
+
+
+class SwappingBackend(translation_backend.TranslationBackend):
+    """Upper cases the texts and swaps their first two tokens, as a translation
+    reordering the elements would. The tokens of a start and end tag are swapped
+    too."""
+
+    name = "swapping"
+
+    def translate(self, texts, to_language, from_language):
+        return [
+            re.sub(r"(__PH_0__)(.*)(__PH_1__)", r"\3\2\1", text.upper())
+            for text in texts
+        ]
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    yield
+    translation_backend.set_backend_factory(
+        translation_backend.create_google_api_backend
+    )
+
+
+def translate(tmp_path):
+    out_folder_path = str(tmp_path / "res")
+    in_file_path = os.path.join(out_folder_path, "values", "strings.xml")
+    if not os.path.exists(in_file_path):
+        os.makedirs(os.path.dirname(in_file_path))
+        with open(in_file_path, "w", encoding="utf-8") as strings_file:
+            strings_file.write(STRINGS)
+    stats = gtranslate.make_other_lang_string_file(
+        "en", ("de", "de"), in_file_path, out_folder_path, False, max_retries=0
+    )
+    assert stats["failed"] == []
+    out_file_path = os.path.join(out_folder_path, "values-de", "strings.xml")
+    with open(out_file_path, "rb") as out_file:
+        return out_file.read()
+
+
+def test_get_text_and_set_text_round_trip():
+    node = ET.fromstring(
+        f'<string xmlns:xliff="{XLIFF}">Hi <xliff:g id="n">%1$s</xliff:g> there</string>'
+    )
+    text = resource_index.get_text(node)
+    assert text == "Hi __PH_0__ there"
+    assert pickle.loads(pickle.dumps(text)).children == text.children
+
+    rebuilt = ET.Element("string", nsmap={"xliff": XLIFF})
+    resource_index.set_text(rebuilt, "Hallo __PH_0__ da", text)
+    assert ET.tostring(rebuilt, encoding=str) == (
+        f'<string xmlns:xliff="{XLIFF}">Hallo <xliff:g id="n">%1$s</xliff:g> da</string>'
+    )
+
+
+def test_text_inside_formatting_elements_is_translatable():
+    node = ET.fromstring(
+        '<string>Tap <b>Save &amp; <a href="x">go</a></b> to continue<br/></string>'
+    )
+    text = resource_index.get_text(node)
+    assert text == "Tap __PH_0__Save & __PH_1__go__PH_2____PH_3__ to continue__PH_4__"
+
+    rebuilt = ET.Element("string")
+    resource_index.set_text(
+        rebuilt, "Tippe __PH_0__Sichern & __PH_1__los__PH_2____PH_3__ an__PH_4__", text
+    )
+    assert ET.tostring(rebuilt, encoding=str) == (
+        '<string>Tippe <b>Sichern &amp; <a href="x">los</a></b> an<br/></string>'
+    )
+
+
+def test_text_after_inline_elements_is_translated(tmp_path):
+    translation_backend.set_backend(translation_backend.PseudoLocBackend())
+    root = ET.fromstring(translate(tmp_path))
+    greeting, copy, songs, _ = root
+
+    assert greeting.text != "Hello "
+    assert greeting[0].text == "%1$s" and greeting[0].get("id") == "user"
+    assert greeting[0].tail.strip(", ") and "welcome" not in greeting[0].tail
+    # the text of a formatting element is translated, the one of xliff:g isn't
+    assert [it.tag for it in copy] == ["b", f"{{{XLIFF}}}g"]
+    assert copy[0].text and copy[0].text != "Bold"
+    assert copy[1].text == "Andy"
+    assert "stay" not in copy[1].tail
+    for item in songs:
+        assert item[0].text == "%d"
+        assert "left" not in item[0].tail
+
+
+def test_reordered_inline_elements_are_kept_by_next_run(tmp_path):
+    translation_backend.set_backend(SwappingBackend())
+    translated = translate(tmp_path)
+    _, copy, _, pair = ET.fromstring(translated)
+    assert [it.text for it in pair] == ["%2$s", "%1$s"]
+    # a start tag moved after its end tag is put back in its place
+    assert [(it.tag, it.text) for it in copy] == [
+        ("b", "BOLD"),
+        (f"{{{XLIFF}}}g", "Andy"),
+    ]
+
+    # the previous translation is kept with its own elements
+    assert translate(tmp_path) == translated
@@ -0,0 +1,92 @@
+import os
+
+from lxml import etree as ET
+
+import core.resources as resources
+
+TEST_STRINGS = os.path.join(os.path.dirname(__file__), "teststrings.xml")
+COMPACT_STRINGS = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<resources><string name="a">Hello</string><string name="b">World</string></resources>\n'
+)
+
+
+def get_output_texts(entries):
+    return [
+        (
+            [item.text for item in it.items]
+            if resources.is_item_container(it.tag)
+            else it.text
+        )
+        for it in entries
+    ]
+
+
+def write_copy(resource_file, entries, out_file_path):
+    os.makedirs(os.path.dirname(out_file_path), exist_ok=True)
+    return resources.write_resource_file(
+        out_file_path, resource_file, [(entries, get_output_texts(entries), ())]
+    )
+
+
+def test_compact_file_is_written_with_its_start_tag(tmp_path):
+    in_file_path = tmp_path / "strings.xml"
+    in_file_path.write_text(COMPACT_STRINGS, encoding="utf-8")
+    out_file_path = str(tmp_path / "values-fr" / "strings.xml")
+
+    resource_file = resources.parse_resource_file(str(in_file_path))
+    write_copy(resource_file, resource_file.entries, out_file_path)
+
+    root = ET.parse(out_file_path).getroot()
+    assert root.tag == "resources"
+    assert [(it.get("name"), it.text) for it in root] == [
+        ("a", "Hello"),
+        ("b", "World"),
+    ]
+
+
+def test_compact_file_is_streamed_with_its_start_tag(tmp_path):
+    in_file_path = tmp_path / "strings.xml"
+    in_file_path.write_text(COMPACT_STRINGS, encoding="utf-8")
+    out_file_path = str(tmp_path / "values-fr" / "strings.xml")
+
+    resource_stream = resources.ResourceStream(str(in_file_path))
+    write_copy(resource_stream, list(resource_stream), out_file_path)
+
+    assert [it.get("name") for it in ET.parse(out_file_path).getroot()] == ["a", "b"]
+
+
+def test_parsed_and_streamed_writers_match_element_tree(tmp_path):
+    expected_path = str(tmp_path / "expected.xml")
+    ET.parse(TEST_STRINGS).write(expected_path, encoding="utf-8", xml_declaration=True)
+    with open(expected_path, "rb") as expected_file:
+        expected = expected_file.read()
+
+    resource_file = resources.parse_resource_file(TEST_STRINGS)
+    parsed_path = str(tmp_path / "values-de" / "strings.xml")
+    write_copy(resource_file, resource_file.entries, parsed_path)
+
+    # the stream is written in chunks of 3 entries, as with -chunk-size 3
+    resource_stream = resources.ResourceStream(TEST_STRINGS)
+    entries = list(resource_stream)
+    streamed_path = str(tmp_path / "values-fr" / "strings.xml")
+    os.makedirs(os.path.dirname(streamed_path))
+    resources.write_resource_file(
+        streamed_path,
+        resource_stream,
+        [
+            (entries[i : i + 3], get_output_texts(entries[i : i + 3]), ())
+            for i in range(0, len(entries), 3)
+        ],
+    )
+
+    for path in (parsed_path, streamed_path):
+        with open(path, "rb") as out_file:
+            assert out_file.read() == expected
+
+
+def test_writer_leaves_an_unchanged_file_untouched(tmp_path):
+    resource_file = resources.parse_resource_file(TEST_STRINGS)
+    out_file_path = str(tmp_path / "values-de" / "strings.xml")
+    assert write_copy(resource_file, resource_file.entries, out_file_path)
+    assert not write_copy(resource_file, resource_file.entries, out_file_path)
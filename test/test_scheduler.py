@@ -0,0 +1,25 @@
+from multiprocessing.pool import ThreadPool
+
+import core.scheduler as scheduler
+
+
+def square(value):
+    return value * value
+
+
+def test_run_by_cost_returns_results_in_input_order():
+    with ThreadPool(2) as pool:
+        assert scheduler.run_by_cost(
+            pool, square, [(1,), (2,), (3,), (4,)], [1, 10, 5, 0]
+        ) == [1, 4, 9, 16]
+
+
+def test_iter_by_cost_starts_the_costliest_first():
+    with ThreadPool(1) as pool:
+        order = [
+            index
+            for index, _ in scheduler.iter_by_cost(
+                pool, square, [(1,), (2,), (3,)], [1, 10, 5]
+            )
+        ]
+    assert order == [1, 2, 0]
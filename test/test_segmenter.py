@@ -0,0 +1,30 @@
+import core.segmenter as segmenter
+
+
+def test_split_keeps_separators_and_outer_whitespace():
+    segmented = segmenter.split("  First line\\n  Second line\nThird ")
+    assert segmenter.get_translatable_segments(segmented) == [
+        "First line",
+        "Second line",
+        "Third",
+    ]
+    assert segmented.separators == ["  ", "\\n  ", "\n", " "]
+
+
+def test_join_rebuilds_the_text_from_translated_segments():
+    text = "  First line\\n  Second line\nThird "
+    segmented = segmenter.split(text)
+    translations = {
+        it: it.upper() for it in segmenter.get_translatable_segments(segmented)
+    }
+    assert (
+        segmenter.join(segmented, translations)
+        == "  FIRST LINE\\n  SECOND LINE\nTHIRD "
+    )
+    identity = {it: it for it in segmenter.get_translatable_segments(segmented)}
+    assert segmenter.join(segmented, identity) == text
+
+
+def test_join_returns_none_when_a_segment_is_missing():
+    segmented = segmenter.split("First\\nSecond")
+    assert segmenter.join(segmented, {"First": "Erste"}) is None
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+import core.resource_index as resource_index
+import core.source_manifest as source_manifest
+import core.translation_backend as translation_backend
+import gtranslate
+
+
+class FailingBackend(translation_backend.TranslationBackend):
+    name = "failing"
+
+    def translate(self, texts, to_language, from_language):
+        raise translation_backend.BackendError("Bad Request", 400)
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    yield
+    translation_backend.set_backend_factory(
+        translation_backend.create_google_api_backend
+    )
+
+
+def write_strings(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as strings_file:
+        strings_file.write(
+            f'<resources>\n    <string name="greeting">{text}</string>\n</resources>\n'
+        )
+
+
+def translate(in_file_path, out_folder_path):
+    return gtranslate.make_other_lang_string_file(
+        "en", ("de", "de"), in_file_path, out_folder_path, False, max_retries=0
+    )
+
+
+def read_greeting(out_folder_path):
+    return resource_index.build_resource_index_from_file(
+        os.path.join(out_folder_path, "values-de", "strings.xml")
+    )[("string", "greeting")]
+
+
+def test_hash_text_changes_with_text():
+    assert source_manifest.hash_text("Hello") == source_manifest.hash_text("Hello")
+    assert source_manifest.hash_text("Hello") != source_manifest.hash_text("Hello!")
+
+
+def test_failed_translation_is_retried_by_next_run(tmp_path):
+    out_folder_path = str(tmp_path / "res")
+    in_file_path = os.path.join(out_folder_path, "values", "strings.xml")
+    write_strings(in_file_path, "Hello")
+    translation_backend.set_backend(translation_backend.PseudoLocBackend())
+    assert translate(in_file_path, out_folder_path)["failed"] == []
+    first_translation = read_greeting(out_folder_path)
+
+    # the english text changed but its new translation fails, the previous one
+    # is kept and so is the hash of the text it was made from
+    write_strings(in_file_path, "Hello there")
+    translation_backend.set_backend(FailingBackend())
+    assert translate(in_file_path, out_folder_path)["failed"] == ["greeting"]
+    assert read_greeting(out_folder_path) == first_translation
+
+    translation_backend.set_backend(translation_backend.PseudoLocBackend())
+    assert translate(in_file_path, out_folder_path)["failed"] == []
+    assert read_greeting(out_folder_path) not in (first_translation, "Hello there")
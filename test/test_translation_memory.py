@@ -0,0 +1,42 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import core.fileutils as string_fileutils
+import core.translation_memory as translation_memory
+
+TEST_FOLDER = os.path.dirname(os.path.abspath(__file__))
+GTRANSLATE = os.path.join(os.path.dirname(TEST_FOLDER), "scripts", "gtranslate.py")
+
+
+def test_pseudo_backend_leaves_the_memory_alone(tmp_path):
+    out_folder_path = str(tmp_path / "res")
+    in_file_path = os.path.join(out_folder_path, "values", "strings.xml")
+    os.makedirs(os.path.dirname(in_file_path))
+    shutil.copy(os.path.join(TEST_FOLDER, "teststrings.xml"), in_file_path)
+    subprocess.run(
+        [
+            sys.executable,
+            GTRANSLATE,
+            "-i",
+            in_file_path,
+            "-o",
+            out_folder_path,
+            "-lang",
+            "de",
+            "-backend",
+            "pseudo",
+        ],
+        capture_output=True,
+        check=True,
+    )
+
+    assert os.path.exists(os.path.join(out_folder_path, "values-de", "strings.xml"))
+    assert not os.path.exists(
+        os.path.join(
+            out_folder_path,
+            string_fileutils.STATE_FOLDER_NAME,
+            translation_memory.MEMORY_FILE_NAME,
+        )
+    )